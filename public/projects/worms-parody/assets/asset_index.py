@@ -0,0 +1,256 @@
+"""
+Asset metadata index for the Worms Parody pipeline
+Each output folder gets an asset-index.json sidecar with dimensions, mode,
+byte size and content hash, written as assets are saved, so summaries and
+listings never have to reopen the images. Entries carry the file's
+(mtime_ns, size) signature, as build_cache does, so a file replaced behind
+the index's back is noticed and re-read.
+
+The index doubles as a content-addressed store: a payload already present in
+the folder (same pixels and encoder settings, or same bytes) is not encoded or
+written again; the new name becomes a hardlink to the existing file, and the
+shared sha256 in the index records the alias.
+
+The last few saved images are also kept decoded in memory, keyed by content
+hash, so a later stage in the same process that loads one of them (or an
+alias of it) through load_image gets the pixels back without another PNG
+decode.
+"""
+
+from collections import OrderedDict
+from PIL import Image
+import hashlib
+import io
+import json
+import os
+import shutil
+
+INDEX_NAME = "asset-index.json"
+
+# Loaded indexes, keyed by directory
+_indexes = {}
+
+# Decoded copies of the most recently saved images: sha256 -> Image
+_decoded = OrderedDict()
+
+# Images kept decoded; enough for one stage to hand its outputs to the next
+DECODED_CACHE_SIZE = 8
+
+def _index_path(directory):
+    return os.path.join(directory, INDEX_NAME)
+
+def read_index(directory):
+    """Load the {filename: metadata} index for a directory"""
+    directory = os.path.abspath(directory)
+    if directory not in _indexes:
+        try:
+            with open(_index_path(directory)) as f:
+                _indexes[directory] = json.load(f)
+        except (OSError, ValueError):
+            _indexes[directory] = {}
+    return _indexes[directory]
+
+def _write_index(directory):
+    directory = os.path.abspath(directory)
+    tmp_path = _index_path(directory) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(_indexes[directory], f, indent=1, sort_keys=True)
+    os.replace(tmp_path, _index_path(directory))
+
+def _metadata(data, img=None):
+    """Metadata for an encoded payload; img may be given to skip the header parse"""
+    entry = {
+        "bytes": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "width": None,
+        "height": None,
+        "mode": None,
+    }
+    if img is None:
+        try:
+            # Image.open only parses the header here, no pixel decode
+            img = Image.open(io.BytesIO(data))
+        except (OSError, SyntaxError):
+            img = None
+    if img is not None:
+        entry.update(width=img.size[0], height=img.size[1], mode=img.mode)
+    return entry
+
+def store_entry(path, entry):
+    """Index path with a ready-made metadata entry (e.g. from a streaming writer)"""
+    directory, name = os.path.split(os.path.abspath(path))
+    entry["signature"] = list(_signature(path))
+    read_index(directory)[name] = entry
+    _write_index(directory)
+    return entry
+
+def record_asset(path, data, img=None, extra=None):
+    """Add or refresh the index entry for bytes just written to path"""
+    entry = _metadata(data, img)
+    entry.update(extra or {})
+    return store_entry(path, entry)
+
+def _signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def _is_current(path, entry):
+    """Whether path is still the file entry was recorded for"""
+    return os.path.isfile(path) and entry.get("signature") == list(_signature(path))
+
+def _remember(entry, img):
+    # A copy, so later in-place edits by the caller do not leak into load_image
+    if img is not None:
+        _decoded[entry["sha256"]] = img.copy()
+        _decoded.move_to_end(entry["sha256"])
+        while len(_decoded) > DECODED_CACHE_SIZE:
+            _decoded.popitem(last=False)
+
+def load_image(path, mode=None):
+    """
+    Decoded image for path: a copy of the in-memory image if this run
+    saved its content recently and the file is unchanged since, otherwise
+    a single decode from disk.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    entry = read_index(directory).get(name)
+    if entry and entry["sha256"] in _decoded and _is_current(path, entry):
+        _decoded.move_to_end(entry["sha256"])
+        img = _decoded[entry["sha256"]].copy()
+    else:
+        img = Image.open(path)
+        img.load()
+    if mode and img.mode != mode:
+        img = img.convert(mode)
+    return img
+
+def _find_payload(directory, field, value):
+    """Name of an indexed file in directory whose entry has field == value"""
+    for name, entry in read_index(directory).items():
+        if entry.get(field) != value:
+            continue
+        # Only link to files unchanged since they were indexed: one rewritten
+        # behind the index's back (even at the same size) may hash differently
+        if _is_current(os.path.join(directory, name), entry):
+            return name
+    return None
+
+def _link(src, path):
+    """Point path at src's bytes: hardlink if possible, else copy"""
+    if os.path.exists(path) and os.path.samefile(src, path):
+        return
+    tmp_path = path + ".tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, path)
+
+def _write_bytes(path, data):
+    # Always replace, never write in place: path may be hardlinked to aliases
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _alias(directory, twin, path, extra=None):
+    """Store path as an alias of the indexed file twin"""
+    _link(os.path.join(directory, twin), path)
+    entry = dict(read_index(directory)[twin])
+    entry.update(extra or {})
+    return store_entry(path, entry)
+
+def write_asset(path, data, img=None):
+    """Write an encoded payload to path (or alias an identical one) and index it"""
+    directory = os.path.dirname(os.path.abspath(path))
+    twin = _find_payload(directory, "sha256", hashlib.sha256(data).hexdigest())
+    if twin is not None:
+        entry = _alias(directory, twin, path)
+    else:
+        _write_bytes(path, data)
+        entry = record_asset(path, data, img)
+    _remember(entry, img)
+    return entry
+
+def remove_asset(path):
+    """Delete path (if present) and drop its index entry"""
+    directory, name = os.path.split(os.path.abspath(path))
+    if os.path.lexists(path):
+        os.remove(path)
+    if read_index(directory).pop(name, None) is not None:
+        _write_index(directory)
+
+def read_manifest(path):
+    """JSON manifest written with write_asset, or {} if missing or unreadable"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def pixel_key(img, format, params):
+    """Hash of everything that determines an encoded payload, taken before encoding"""
+    digest = hashlib.sha256()
+    header = (format, sorted(params.items()), img.mode, img.size,
+              img.getpalette() if img.mode == "P" else None, sorted(img.info.items()))
+    digest.update(repr(header).encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+def save_image(img, path, format=None, **params):
+    """
+    Encode img once in memory, write it to path and index it.
+    If the folder already holds this exact payload, skip the encode and
+    store path as a hardlinked alias instead.
+    """
+    if format is None:
+        format = Image.registered_extensions()[os.path.splitext(path)[1].lower()]
+    directory = os.path.dirname(os.path.abspath(path))
+    key = pixel_key(img, format, params)
+    twin = _find_payload(directory, "pixel_key", key)
+    if twin is not None:
+        entry = _alias(directory, twin, path)
+    else:
+        buffer = io.BytesIO()
+        img.save(buffer, format, **params)
+        data = buffer.getvalue()
+        twin = _find_payload(directory, "sha256", hashlib.sha256(data).hexdigest())
+        if twin is not None:
+            entry = _alias(directory, twin, path, {"pixel_key": key})
+        else:
+            _write_bytes(path, data)
+            entry = record_asset(path, data, img, {"pixel_key": key})
+    # Lossy formats decode to different pixels, so only keep PNGs
+    if format == "PNG":
+        _remember(entry, img)
+    return entry
+
+def list_assets(directory, extensions=None):
+    """
+    Sorted (filename, metadata) pairs for a directory, read from its index.
+    Files that were never indexed (hand-placed assets) or changed since
+    they were are (re)indexed.
+    """
+    index = read_index(directory)
+    listing = []
+    changed = False
+    for name in sorted(os.listdir(directory)):
+        if name == INDEX_NAME or name.endswith(".tmp"):
+            continue
+        if extensions and not name.lower().endswith(tuple(extensions)):
+            continue
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        if name not in index or not _is_current(path, index[name]):
+            with open(path, "rb") as f:
+                entry = _metadata(f.read())
+            entry["signature"] = list(_signature(path))
+            index[name] = entry
+            changed = True
+        listing.append((name, index[name]))
+    if changed:
+        _write_index(directory)
+    return listing
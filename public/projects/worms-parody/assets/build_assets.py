@@ -0,0 +1,25 @@
+"""
+Run the Worms Parody asset pipeline in one process
+Images saved by one stage reach the next in memory (asset_index.load_image),
+so each asset is decoded once and encoded once per run; disk is only the sink.
+
+Usage: python build_assets.py [--ai [--tiered]]
+"""
+
+import sys
+
+import create_animation_assets
+import process_assets
+
+def main(use_ai=False, tiered=False):
+    if use_ai:
+        # rembg is only needed for the AI path
+        import process_assets_ai
+        process_assets_ai.main(tiered=tiered)
+    else:
+        process_assets.main()
+    print()
+    create_animation_assets.main()
+
+if __name__ == "__main__":
+    main(use_ai="--ai" in sys.argv[1:], tiered="--tiered" in sys.argv[1:])
@@ -0,0 +1,126 @@
+"""
+Persistent content-hash build cache for the Worms Parody asset pipeline
+A stage is skipped when its input hashes, parameters and outputs are unchanged.
+The code a stage runs counts as an input: the calling script and every
+pipeline module it imports, directly or not, are added automatically.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sys
+import types
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(ASSETS_DIR, ".build-cache.json")
+
+# Loaded lazily: {"files": {rel: [mtime_ns, size, sha256]}, "stages": {name: {...}}}
+_cache = None
+
+def _load():
+    global _cache
+    if _cache is None:
+        try:
+            with open(CACHE_PATH) as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+        _cache.setdefault("files", {})
+        _cache.setdefault("stages", {})
+    return _cache
+
+def _save():
+    tmp_path = CACHE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(_cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, CACHE_PATH)
+
+def _rel(path):
+    return os.path.relpath(os.path.abspath(path), ASSETS_DIR)
+
+def _signature(path):
+    """Cheap change detector: (mtime_ns, size), or None if missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def file_hash(path):
+    """SHA-256 of a file, only re-read when its mtime or size changed"""
+    files = _load()["files"]
+    rel = _rel(path)
+    sig = _signature(path)
+    entry = files.get(rel)
+    if sig is not None and entry and entry[:2] == sig:
+        return entry[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    files[rel] = sig + [digest.hexdigest()]
+    return digest.hexdigest()
+
+def _local_module(value):
+    """The pipeline module value is, or was defined in, if any"""
+    if not isinstance(value, types.ModuleType):
+        value = sys.modules.get(getattr(value, "__module__", None) or "")
+    path = getattr(value, "__file__", None)
+    if path and os.path.dirname(os.path.abspath(path)) == ASSETS_DIR:
+        return value
+    return None
+
+@functools.lru_cache(maxsize=None)
+def _code_inputs(module_name):
+    """Source files of a module and of every pipeline module it reaches"""
+    paths = set()
+    pending = [sys.modules[module_name]]
+    while pending:
+        module = pending.pop()
+        path = os.path.abspath(module.__file__)
+        if path in paths:
+            continue
+        paths.add(path)
+        for value in list(vars(module).values()):
+            dep = _local_module(value)
+            if dep is not None and dep is not sys.modules[__name__]:
+                pending.append(dep)
+    return sorted(paths)
+
+def _with_code(inputs):
+    """inputs plus the code of the module that called is_fresh/record"""
+    caller = sys._getframe(2).f_globals["__name__"]
+    return list(inputs) + _code_inputs(caller)
+
+def stage_key(stage, inputs, params):
+    """Hash of stage name, input contents and parameters"""
+    payload = {
+        "stage": stage,
+        "inputs": {_rel(p): file_hash(p) for p in inputs},
+        "params": params,
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def is_fresh(stage, inputs, outputs, **params):
+    """
+    True if stage last ran with the same inputs and params, and every output
+    is still exactly what that run wrote (another script may overwrite it).
+    """
+    if os.environ.get("WORMS_REBUILD"):
+        return False
+    entry = _load()["stages"].get(stage)
+    if not entry or entry["key"] != stage_key(stage, _with_code(inputs), params):
+        return False
+    recorded = entry["outputs"]
+    return all(recorded.get(_rel(p)) == _signature(p) for p in outputs)
+
+def record(stage, inputs, outputs, **params):
+    """Remember a completed stage so the next run can skip it"""
+    cache = _load()
+    cache["stages"][stage] = {
+        "key": stage_key(stage, _with_code(inputs), params),
+        "outputs": {_rel(p): _signature(p) for p in outputs},
+    }
+    _save()
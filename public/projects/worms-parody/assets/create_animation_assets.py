@@ -6,10 +6,19 @@ C) Baby mouth worm composites
 """
 
 from PIL import Image, ImageDraw, ImageFilter
+from collections import OrderedDict
+import functools
+import json
 import os
 import random
 import math
 
+import numpy as np
+
+import build_cache
+import gradients
+from asset_index import save_image, load_image, write_asset, list_assets
+
 ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
 PROCESSED_DIR = os.path.join(ASSETS_DIR, "processed")
 OUTPUT_DIR = os.path.join(ASSETS_DIR, "animation-ready")
@@ -19,6 +28,79 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # A) RFK JAW SEPARATION
 # =============================================================================
 
+JAW_CURVE_DEPTH = 30  # How far the jawline dips at the chin (px)
+JAW_FEATHER = 2       # Gaussian blur radius on the cut edge
+
+# Pre-rendered jaw-open frames: 0..JAW_OPEN_ANGLE degrees in JAW_FRAME_STEP
+# steps (JAW_OPEN_ANGLE matches CONFIG.JAW_OPEN_ANGLE in animation.js)
+JAW_OPEN_ANGLE = 15
+JAW_FRAME_STEP = 2.5
+
+def jaw_mask_band(width, height, jaw_start_y):
+    """
+    Feathered jaw mask, 255 below a parabolic jawline that dips at the chin
+    (higher at the edges, lowest in the middle), 0 above it.
+    Returns (first row, mask rows): rows above the band are 0 and rows below
+    it 255, so only the band around the curve is built and blurred.
+    """
+    x = np.arange(width)
+    normalized_x = (x - width / 2) / (width / 2)  # -1 to 1
+    curve = jaw_start_y + (JAW_CURVE_DEPTH * (1 - normalized_x ** 2)).astype(np.intp)
+
+    # Pad past the blur's reach so the band edges are constant rows and
+    # blurring the band matches blurring the whole mask
+    pad = 8 * JAW_FEATHER
+    top = max(0, int(curve.min()) - pad)
+    bottom = min(height, int(curve.max()) + pad + 1)
+    rows = np.arange(top, bottom)[:, None]
+    band = Image.fromarray(np.where(rows >= curve, 255, 0).astype(np.uint8), "L")
+    band = band.filter(ImageFilter.GaussianBlur(JAW_FEATHER))
+    return top, np.asarray(band, dtype=np.uint32)
+
+def jaw_frame_angles(max_angle=JAW_OPEN_ANGLE, step=JAW_FRAME_STEP):
+    """Jaw angles to pre-render, closed (0) to fully open"""
+    return [round(i * step, 3) for i in range(int(round(max_angle / step)) + 1)]
+
+def render_jaw_frames(head_img, jaw_img, jaw_bbox, pivot, angles):
+    """
+    Composite the jaw over the head once per angle, rotated clockwise about
+    pivot (like ctx.rotate in animation.js), and pack the frames into one
+    horizontal strip. Every frame is trimmed to the same box, the union of
+    all frames' content, so frames line up when drawn at the same spot.
+    Returns (strip, index).
+    """
+    jaw_layer = Image.new("RGBA", head_img.size, (0, 0, 0, 0))
+    jaw_layer.paste(jaw_img, jaw_bbox[:2])
+
+    frames = []
+    for angle in angles:
+        rotated = jaw_layer.rotate(-angle, resample=Image.Resampling.BICUBIC, center=pivot)
+        frames.append(Image.alpha_composite(head_img, rotated))
+
+    boxes = [frame.getbbox() or (0, 0, 1, 1) for frame in frames]
+    trim = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+    frame_w, frame_h = trim[2] - trim[0], trim[3] - trim[1]
+
+    strip = Image.new("RGBA", (frame_w * len(frames), frame_h), (0, 0, 0, 0))
+    for i, frame in enumerate(frames):
+        strip.paste(frame.crop(trim), (i * frame_w, 0))
+
+    index = {
+        "image": "rfk-jaw-frames.png",
+        "frameWidth": frame_w,
+        "frameHeight": frame_h,
+        # Where the trimmed frame sits in the full head image
+        "offsetX": trim[0],
+        "offsetY": trim[1],
+        "sourceW": head_img.width,
+        "sourceH": head_img.height,
+        "pivot": list(pivot),
+        # frames[i] is at x = i * frameWidth; pick round(jawOpen * (count - 1))
+        "frames": [{"angle": angle, "x": i * frame_w, "y": 0} for i, angle in enumerate(angles)],
+    }
+    return strip, index
+
 def separate_rfk_jaw():
     """
     Separate RFK's jaw from his head for lip-sync animation.
@@ -29,70 +111,57 @@ def separate_rfk_jaw():
     print("="*60)
 
     img_path = os.path.join(PROCESSED_DIR, "rfk-head-clean.png")
-    img = Image.open(img_path).convert("RGBA")
+    head_path = os.path.join(OUTPUT_DIR, "rfk-head-nojaw.png")
+    jaw_path = os.path.join(OUTPUT_DIR, "rfk-jaw.png")
+    info_path = os.path.join(OUTPUT_DIR, "rfk-jaw-info.txt")
+    frames_path = os.path.join(OUTPUT_DIR, "rfk-jaw-frames.png")
+    frames_index_path = os.path.join(OUTPUT_DIR, "rfk-jaw-frames.json")
+    outputs = [head_path, jaw_path, info_path, frames_path, frames_index_path]
+    if build_cache.is_fresh("separate_rfk_jaw", [img_path], outputs):
+        print("  Up to date: rfk-head-nojaw.png, rfk-jaw.png, rfk-jaw-frames.png")
+        return None
+
+    img = load_image(img_path, "RGBA")
     width, height = img.size
 
     # The jaw line is roughly at 70% down the face
     # We'll create a curved cut following the jawline
     jaw_start_y = int(height * 0.68)  # Where jaw separation begins
 
-    # Create masks for head (above jaw) and jaw (below)
-    head_mask = Image.new("L", (width, height), 255)
-    jaw_mask = Image.new("L", (width, height), 0)
-
-    head_draw = ImageDraw.Draw(head_mask)
-    jaw_draw = ImageDraw.Draw(jaw_mask)
-
-    # Create a curved jawline cut
-    # The curve goes from ear to ear, dipping at the chin
-    points = []
-    for x in range(width):
-        # Parabolic curve - higher at edges, lower in middle (chin)
-        normalized_x = (x - width/2) / (width/2)  # -1 to 1
-        curve_offset = int(30 * (1 - normalized_x**2))  # Dip in middle
-        y = jaw_start_y + curve_offset
-        points.append((x, y))
-
-    # Draw the separation
-    # Head: everything above the curve
-    head_points = points + [(width, 0), (0, 0)]
-    head_draw.polygon(head_points, fill=255)
-
-    # Jaw: everything below the curve
-    jaw_points = points + [(width, height), (0, height)]
-    jaw_draw.polygon(jaw_points, fill=255)
-
-    # Apply feathering to the cut edge for smoother blending
-    head_mask = head_mask.filter(ImageFilter.GaussianBlur(2))
-    jaw_mask = jaw_mask.filter(ImageFilter.GaussianBlur(2))
-
-    # Create head image (jaw area transparent)
-    head_img = img.copy()
-    head_alpha = head_img.split()[3]
-    head_alpha = Image.composite(head_alpha, Image.new("L", (width, height), 0), head_mask)
-    head_img.putalpha(head_alpha)
-
-    # Create jaw image (head area transparent)
-    jaw_img = img.copy()
-    jaw_alpha = jaw_img.split()[3]
-    jaw_alpha = Image.composite(jaw_alpha, Image.new("L", (width, height), 0), jaw_mask)
-    jaw_img.putalpha(jaw_alpha)
+    # The head layer keeps the whole face: with the jaw drawn over it there
+    # is no gap behind the jaw when it rotates open
+    head_img = img
+
+    # Jaw: everything below the curve, feathered. Rows outside the band are
+    # fully in or out, so only the band is masked and nothing above it is copied
+    band_top, band = jaw_mask_band(width, height, jaw_start_y)
+    jaw = np.array(img.crop((0, band_top, width, height)))
+    alpha = jaw[:len(band), :, 3].astype(np.uint32) * band + 128
+    jaw[:len(band), :, 3] = (alpha + (alpha >> 8)) >> 8
 
     # Crop jaw to its bounding box
+    jaw_img = Image.fromarray(jaw, "RGBA")
     jaw_bbox = jaw_img.getbbox()
     if jaw_bbox:
         jaw_img = jaw_img.crop(jaw_bbox)
+        jaw_bbox = (jaw_bbox[0], jaw_bbox[1] + band_top, jaw_bbox[2], jaw_bbox[3] + band_top)
 
     # Save
-    head_path = os.path.join(OUTPUT_DIR, "rfk-head-nojaw.png")
-    jaw_path = os.path.join(OUTPUT_DIR, "rfk-jaw.png")
-
-    head_img.save(head_path, "PNG")
-    jaw_img.save(jaw_path, "PNG")
+    save_image(head_img, head_path)
+    save_image(jaw_img, jaw_path)
 
     print(f"  Saved: rfk-head-nojaw.png ({head_img.size[0]}x{head_img.size[1]})")
     print(f"  Saved: rfk-jaw.png ({jaw_img.size[0]}x{jaw_img.size[1]})")
 
+    # Pre-render the jaw opening so lip sync is one blit per frame
+    if jaw_bbox:
+        strip, index = render_jaw_frames(head_img, jaw_img, jaw_bbox, (width // 2, jaw_start_y),
+                                         jaw_frame_angles())
+        save_image(strip, frames_path)
+        write_asset(frames_index_path, json.dumps(index, indent=1).encode())
+        print(f"  Saved: rfk-jaw-frames.png ({len(index['frames'])} frames of "
+              f"{index['frameWidth']}x{index['frameHeight']})")
+
     # Also save jaw position info
     jaw_info = f"""# RFK Jaw Position Info
 
@@ -105,9 +174,11 @@ Jaw anchor point (for rotation): approximately center-top of jaw image
 - Rotate the jaw 5-15 degrees for open mouth
 - Jaw anchor X: {width // 2}
 - Jaw anchor Y: {jaw_start_y}
+- Pre-rendered: rfk-jaw-frames.png, {len(jaw_frame_angles())} frames at 0-{JAW_OPEN_ANGLE} degrees
+  (layout in rfk-jaw-frames.json)
 """
-    with open(os.path.join(OUTPUT_DIR, "rfk-jaw-info.txt"), "w") as f:
-        f.write(jaw_info)
+    write_asset(info_path, jaw_info.encode())
+    build_cache.record("separate_rfk_jaw", [img_path], outputs)
 
     return head_img, jaw_img
 
@@ -115,8 +186,8 @@ Jaw anchor point (for rotation): approximately center-top of jaw image
 # B) CARTOON WORM CHARACTER SHEET
 # =============================================================================
 
-def draw_worm(draw, x, y, size, color, expression="neutral", angle=0):
-    """Draw a simple cartoon worm at position"""
+def draw_worm(draw, x, y, size, color, expression="neutral", angle=0, phase=0):
+    """Draw a simple cartoon worm at position; phase (radians) shifts the S-curve sway"""
     # Worm is basically an S-curve tube with a face
 
     # Body color and highlight
@@ -132,7 +203,7 @@ def draw_worm(draw, x, y, size, color, expression="neutral", angle=0):
     for i in range(segments):
         t = i / (segments - 1)
         # S-curve: offset alternates
-        curve_x = x + math.sin(t * math.pi * 1.5) * (size * 0.3)
+        curve_x = x + math.sin(t * math.pi * 1.5 + phase) * (size * 0.3)
         curve_y = y + t * size
 
         # Draw segment
@@ -145,7 +216,7 @@ def draw_worm(draw, x, y, size, color, expression="neutral", angle=0):
         ], fill=seg_color, outline=shadow)
 
     # Head (first segment, larger)
-    head_x = x + math.sin(0) * (size * 0.3)
+    head_x = x + math.sin(phase) * (size * 0.3)
     head_y = y
     head_size = segment_size * 1.3
 
@@ -248,6 +319,13 @@ def create_worm_character_sheet():
     print("B) CREATING WORM CHARACTER SHEET")
     print("="*60)
 
+    expressions = ["neutral", "happy", "open", "smug", "chomp", "looking_up"]
+    sheet_path = os.path.join(OUTPUT_DIR, "worm-character-sheet.png")
+    outputs = [sheet_path] + [os.path.join(OUTPUT_DIR, f"worm-{expr}.png") for expr in expressions]
+    if build_cache.is_fresh("create_worm_character_sheet", [], outputs):
+        print("  Up to date: worm-character-sheet.png and worm-*.png")
+        return None
+
     # Pink worm color
     worm_pink = (255, 180, 190, 255)
 
@@ -261,7 +339,6 @@ def create_worm_character_sheet():
     draw.text((20, 10), "WORM CHARACTER SHEET", fill=(0, 0, 0, 255))
 
     # Draw worms with different expressions
-    expressions = ["neutral", "happy", "open", "smug", "chomp", "looking_up"]
     labels = ["Neutral", "Happy", "Singing", "Smug", "Chomp!", "Looking Up"]
 
     worm_size = 120
@@ -279,8 +356,7 @@ def create_worm_character_sheet():
         draw.text((x - 30, y + worm_size + 20), label, fill=(0, 0, 0, 255))
 
     # Save sheet
-    sheet_path = os.path.join(OUTPUT_DIR, "worm-character-sheet.png")
-    sheet.save(sheet_path, "PNG")
+    save_image(sheet, sheet_path)
     print(f"  Saved: worm-character-sheet.png ({sheet_width}x{sheet_height})")
 
     # Also create individual worm images
@@ -290,20 +366,54 @@ def create_worm_character_sheet():
         draw_worm(worm_draw, 75, 40, 140, worm_pink, expression=expr)
 
         worm_path = os.path.join(OUTPUT_DIR, f"worm-{expr}.png")
-        worm_img.save(worm_path, "PNG")
+        save_image(worm_img, worm_path)
         print(f"  Saved: worm-{expr}.png")
 
+    build_cache.record("create_worm_character_sheet", [], outputs)
     return sheet
 
 # =============================================================================
 # C) BABY MOUTH WORM COMPOSITES (DUNE WORMS)
 # =============================================================================
 
-def create_dune_worm_body(width, height, segments=12):
-    """Create a large segmented worm body"""
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
+# The GIANT Dune worm: body segments, mouth width as a fraction of the body,
+# mouth top (px at GIANT_SIZE) and the darkest emergence shading alpha
+GIANT_SIZE = (800, 1000)
+GIANT_SEGMENTS = 16
+GIANT_MOUTH_WIDTH = 0.85
+GIANT_MOUTH_Y = 20
+GIANT_SHADE = 200
+
+# Decoded and resized layers kept by layer(), least recently used dropped first
+LAYER_CACHE_SIZE = 32
+_layers = OrderedDict()
+
+def layer(path, size=None):
+    """
+    path decoded as RGBA, LANCZOS-resized to size if given. Memoized by
+    (content hash, size), so identical sources and repeated sizes are only
+    decoded and resized once per run.
+    Returned images are shared: copy before drawing on them.
+    """
+    key = (build_cache.file_hash(path), size)
+    if key in _layers:
+        _layers.move_to_end(key)
+        return _layers[key]
+    if size is None:
+        img = load_image(path, "RGBA")
+    else:
+        # Always resample from the full-size source, never from another size
+        img = layer(path).resize(size, Image.Resampling.LANCZOS)
+    _layers[key] = img
+    if len(_layers) > LAYER_CACHE_SIZE:
+        _layers.popitem(last=False)
+    return img
 
+def draw_dune_worm_body(draw, width, height, segments=12, top=0):
+    """
+    Draw a width x height segmented worm body, shifted up by top rows so a
+    band of a larger body can be drawn on its own (see render_giant_worm.py)
+    """
     # Worm colors - fleshy pink/gray
     colors = [
         (200, 150, 160, 255),  # Base pink
@@ -327,10 +437,19 @@ def create_dune_worm_body(width, height, segments=12):
         x_offset = (width - seg_width) // 2
 
         draw.ellipse([
-            x_offset, y,
-            x_offset + seg_width, y + segment_height + 10
+            x_offset, y - top,
+            x_offset + seg_width, y - top + segment_height + 10
         ], fill=color, outline=(100, 80, 90, 255))
 
+@functools.lru_cache(maxsize=8)
+def create_dune_worm_body(width, height, segments=12):
+    """
+    Create a large segmented worm body.
+    Memoized per (width, height, segments): the image is shared, so copy it
+    before drawing on it.
+    """
+    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw_dune_worm_body(ImageDraw.Draw(img), width, height, segments)
     return img
 
 def composite_baby_mouth_worm():
@@ -339,29 +458,36 @@ def composite_baby_mouth_worm():
     print("C) CREATING BABY MOUTH WORM COMPOSITES")
     print("="*60)
 
-    # Load baby mouths
+    # Find baby mouths
     baby_mouths = []
     for i in [1, 2, 3, 5]:  # Skip 4, it's not a baby
         mouth_path = os.path.join(PROCESSED_DIR, f"babymouth{i}.png")
         if os.path.exists(mouth_path):
-            baby_mouths.append((i, Image.open(mouth_path).convert("RGBA")))
+            baby_mouths.append((i, mouth_path))
 
     if not baby_mouths:
         print("  No baby mouth images found!")
         return
 
     # Create several Dune worm variants
-    for idx, (mouth_num, mouth_img) in enumerate(baby_mouths):
-        # Create worm body
+    for idx, (mouth_num, mouth_path) in enumerate(baby_mouths):
         worm_width = 400
         worm_height = 600
+        output_path = os.path.join(OUTPUT_DIR, f"dune-worm-babymouth{mouth_num}.png")
+        stage = f"composite_baby_mouth_worm:{mouth_num}"
+        if build_cache.is_fresh(stage, [mouth_path], [output_path]):
+            print(f"  Up to date: dune-worm-babymouth{mouth_num}.png")
+            continue
+        mouth_img = layer(mouth_path)
+
+        # Create worm body
         worm_body = create_dune_worm_body(worm_width, worm_height)
 
         # Scale mouth to fit worm width
         mouth_scale = (worm_width * 0.9) / mouth_img.width
         new_mouth_width = int(mouth_img.width * mouth_scale)
         new_mouth_height = int(mouth_img.height * mouth_scale)
-        mouth_resized = mouth_img.resize((new_mouth_width, new_mouth_height), Image.Resampling.LANCZOS)
+        mouth_resized = layer(mouth_path, (new_mouth_width, new_mouth_height))
 
         # Position mouth at top of worm (it's emerging upward)
         mouth_x = (worm_width - new_mouth_width) // 2
@@ -372,58 +498,51 @@ def composite_baby_mouth_worm():
         result.paste(mouth_resized, (mouth_x, mouth_y), mouth_resized)
 
         # Add some "emergence" effect - darker at bottom
-        overlay = Image.new("RGBA", (worm_width, worm_height), (0, 0, 0, 0))
-        overlay_draw = ImageDraw.Draw(overlay)
-        for y in range(worm_height // 2, worm_height):
-            alpha = int(180 * (y - worm_height//2) / (worm_height//2))
-            overlay_draw.line([(0, y), (worm_width, y)], fill=(0, 0, 0, alpha))
+        overlay = gradients.alpha_ramp(worm_width, worm_height, worm_height // 2, 180, span=worm_height // 2)
 
         result = Image.alpha_composite(result, overlay)
 
         # Save
-        output_path = os.path.join(OUTPUT_DIR, f"dune-worm-babymouth{mouth_num}.png")
-        result.save(output_path, "PNG")
+        save_image(result, output_path)
+        build_cache.record(stage, [mouth_path], [output_path])
         print(f"  Saved: dune-worm-babymouth{mouth_num}.png ({worm_width}x{worm_height})")
 
     # Create a GIANT one with babymouth1 (the screaming one)
     print("\n  Creating GIANT Dune worm (for the bridge scene)...")
-    giant_width = 800
-    giant_height = 1000
-    giant_body = create_dune_worm_body(giant_width, giant_height, segments=16)
+    giant_width, giant_height = GIANT_SIZE
+    giant_mouth_path = os.path.join(PROCESSED_DIR, "babymouth1.png")
+    output_path = os.path.join(OUTPUT_DIR, "DUNE-WORM-GIANT.png")
+    if build_cache.is_fresh("composite_baby_mouth_worm:giant", [giant_mouth_path], [output_path]):
+        print("  Up to date: DUNE-WORM-GIANT.png")
+        return
+    giant_body = create_dune_worm_body(giant_width, giant_height, segments=GIANT_SEGMENTS)
 
     # Use babymouth1 (the best screaming one)
-    mouth_img = Image.open(os.path.join(PROCESSED_DIR, "babymouth1.png")).convert("RGBA")
-    mouth_scale = (giant_width * 0.85) / mouth_img.width
-    giant_mouth = mouth_img.resize(
-        (int(mouth_img.width * mouth_scale), int(mouth_img.height * mouth_scale)),
-        Image.Resampling.LANCZOS
-    )
+    mouth_img = layer(giant_mouth_path)
+    mouth_scale = (giant_width * GIANT_MOUTH_WIDTH) / mouth_img.width
+    giant_mouth = layer(giant_mouth_path, (int(mouth_img.width * mouth_scale), int(mouth_img.height * mouth_scale)))
 
     # Position
     mouth_x = (giant_width - giant_mouth.width) // 2
-    mouth_y = 20
+    mouth_y = GIANT_MOUTH_Y
 
     giant_result = giant_body.copy()
     giant_result.paste(giant_mouth, (mouth_x, mouth_y), giant_mouth)
 
     # Darker emergence overlay
-    overlay = Image.new("RGBA", (giant_width, giant_height), (0, 0, 0, 0))
-    overlay_draw = ImageDraw.Draw(overlay)
-    for y in range(giant_height // 2, giant_height):
-        alpha = int(200 * (y - giant_height//2) / (giant_height//2))
-        overlay_draw.line([(0, y), (giant_width, y)], fill=(0, 0, 0, alpha))
+    overlay = gradients.alpha_ramp(giant_width, giant_height, giant_height // 2, GIANT_SHADE, span=giant_height // 2)
 
     giant_result = Image.alpha_composite(giant_result, overlay)
 
-    output_path = os.path.join(OUTPUT_DIR, "DUNE-WORM-GIANT.png")
-    giant_result.save(output_path, "PNG")
+    save_image(giant_result, output_path)
+    build_cache.record("composite_baby_mouth_worm:giant", [giant_mouth_path], [output_path])
     print(f"  Saved: DUNE-WORM-GIANT.png ({giant_width}x{giant_height}) - THE BIG ONE!")
 
 # =============================================================================
 # MAIN
 # =============================================================================
 
-if __name__ == "__main__":
+def main():
     print("="*60)
     print("WORMS PARODY - ANIMATION ASSET CREATION")
     print("="*60)
@@ -444,8 +563,9 @@ if __name__ == "__main__":
 
     # List all created files
     print("\nCreated files:")
-    for f in sorted(os.listdir(OUTPUT_DIR)):
-        path = os.path.join(OUTPUT_DIR, f)
-        if os.path.isfile(path):
-            size = os.path.getsize(path) // 1024
-            print(f"  {f:40} ({size:>4} KB)")
+    for f, meta in list_assets(OUTPUT_DIR):
+        size = meta["bytes"] // 1024
+        print(f"  {f:40} ({size:>4} KB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Web-delivery encoder for Worms Parody assets
+Tries max-compression PNG, palette PNG8, WebP and AVIF for every asset and
+keeps the smallest variant within its byte budget and error bound. When
+nothing meeting the error bound fits the budget, WebP and AVIF are searched
+again for the highest quality that does fit, and the one with the best PSNR
+ships (its PSNR, below MIN_PSNR, is recorded in the manifest).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, features
+import io
+import json
+import os
+
+import numpy as np
+
+import build_cache
+from asset_index import read_manifest, remove_asset, write_asset
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(ASSETS_DIR, "web")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+
+# Folders (relative to ASSETS_DIR) and extensions to encode
+SOURCE_DIRS = [
+    ("processed", (".png",)),
+    ("animation-ready", (".png",)),
+    ("Instruments", (".png",)),
+    ("backgrounds", (".jpg", ".png")),
+]
+
+# Byte budgets: default plus per-file overrides (by filename)
+DEFAULT_BUDGET = 150 * 1024
+BUDGETS = {
+    "rfk-head-clean.png": 250 * 1024,
+    "DUNE-WORM-GIANT.png": 250 * 1024,
+}
+
+# Minimum alpha-weighted PSNR (dB) a lossy or palette variant must reach
+MIN_PSNR = 40.0
+
+def psnr(reference, candidate):
+    """
+    PSNR between two RGBA images on premultiplied color plus alpha,
+    averaged over pixels visible in either image only, so hidden color
+    under transparency does not count and empty margins do not dilute
+    the error.
+    """
+    ref = np.asarray(reference.convert("RGBA"), dtype=np.float32)
+    out = np.asarray(candidate.convert("RGBA"), dtype=np.float32)
+    visible = (ref[..., 3] > 0) | (out[..., 3] > 0)
+    if not visible.any():
+        return float("inf")
+    ref[..., :3] *= ref[..., 3:] / 255.0
+    out[..., :3] *= out[..., 3:] / 255.0
+    mse = float(np.mean((ref[visible] - out[visible]) ** 2))
+    if mse == 0:
+        return float("inf")
+    return 10 * np.log10(255.0 ** 2 / mse)
+
+def _encode(img, format, **params):
+    buffer = io.BytesIO()
+    img.save(buffer, format, **params)
+    return buffer.getvalue()
+
+def _decode(data):
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img
+
+def encode_png(img):
+    """Lossless PNG at maximum zlib effort"""
+    return _encode(img, "PNG", optimize=True, compress_level=9)
+
+def encode_png8(img):
+    """Palette-quantized PNG8 (keeps alpha in the palette)"""
+    method = Image.Quantize.FASTOCTREE if img.mode == "RGBA" else Image.Quantize.MEDIANCUT
+    return _encode(img.quantize(256, method=method), "PNG", optimize=True)
+
+def search_quality(img, format, min_psnr, **params):
+    """
+    Binary-search the lowest quality whose decode still reaches min_psnr;
+    lower quality means fewer bytes, so that is the smallest passing payload.
+    Returns (data, quality, psnr) or None if even quality 100 fails.
+    """
+    lo, hi = 1, 100
+    best = None
+    while lo <= hi:
+        quality = (lo + hi) // 2
+        data = _encode(img, format, quality=quality, **params)
+        score = psnr(img, _decode(data))
+        if score >= min_psnr:
+            best = (data, quality, score)
+            hi = quality - 1
+        else:
+            lo = quality + 1
+    return best
+
+def fit_budget(img, format, budget, **params):
+    """
+    Binary-search the highest quality whose payload fits in budget bytes;
+    higher quality means fewer artifacts, so that is the best fitting payload.
+    Returns (data, quality, psnr) or None if even quality 1 is over budget.
+    """
+    lo, hi = 1, 100
+    best = None
+    while lo <= hi:
+        quality = (lo + hi) // 2
+        data = _encode(img, format, quality=quality, **params)
+        if len(data) <= budget:
+            best = (data, quality)
+            lo = quality + 1
+        else:
+            hi = quality - 1
+    if best is None:
+        return None
+    return best[0], best[1], psnr(img, _decode(best[0]))
+
+def budget_candidates(img, budget):
+    """Yield (format label, extension, data, psnr) for lossy encodings that fit budget"""
+    if features.check("webp"):
+        found = fit_budget(img, "WEBP", budget, method=4)
+        if found:
+            yield f"webp-q{found[1]}", ".webp", found[0], found[2]
+
+    if features.check("avif"):
+        found = fit_budget(img, "AVIF", budget, speed=6)
+        if found:
+            yield f"avif-q{found[1]}", ".avif", found[0], found[2]
+
+def candidates(img, min_psnr=MIN_PSNR):
+    """Yield (format label, extension, data, psnr) for every qualifying encoding"""
+    yield "png", ".png", encode_png(img), float("inf")
+
+    data = encode_png8(img)
+    score = psnr(img, _decode(data))
+    if score >= min_psnr:
+        yield "png8", ".png", data, score
+
+    if features.check("webp"):
+        yield "webp-lossless", ".webp", _encode(img, "WEBP", lossless=True, method=6), float("inf")
+        found = search_quality(img, "WEBP", min_psnr, method=4)
+        if found:
+            yield f"webp-q{found[1]}", ".webp", found[0], found[2]
+
+    if features.check("avif"):
+        found = search_quality(img, "AVIF", min_psnr, speed=6)
+        if found:
+            yield f"avif-q{found[1]}", ".avif", found[0], found[2]
+
+def encode_asset(rel_path, budget=DEFAULT_BUDGET, min_psnr=MIN_PSNR):
+    """
+    Encode one asset (path relative to ASSETS_DIR) every way and pick the
+    smallest variant within budget and min_psnr. If none fits, the budget
+    wins over min_psnr: the fitting lossy variant with the best PSNR is
+    picked, and only if nothing fits at all the smallest overall.
+    The source file itself always competes, so output never grows.
+    Runs in a worker process, so it returns bytes instead of writing.
+    """
+    path = os.path.join(ASSETS_DIR, rel_path)
+    with open(path, "rb") as f:
+        source = ("source", os.path.splitext(rel_path)[1].lower(), f.read(), float("inf"))
+    img = Image.open(path)
+    img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+    tried = sorted([source, *candidates(img, min_psnr)], key=lambda c: len(c[2]))
+    within = [c for c in tried if len(c[2]) <= budget]
+    if within:
+        label, ext, data, score = within[0]
+    else:
+        fitted = sorted(budget_candidates(img, budget), key=lambda c: -c[3])
+        tried = sorted(tried + fitted, key=lambda c: len(c[2]))
+        label, ext, data, score = (fitted or tried)[0]
+    return {
+        "source": rel_path,
+        "format": label,
+        "ext": ext,
+        "data": data,
+        "psnr": None if score == float("inf") else round(score, 2),
+        "within_budget": len(data) <= budget,
+        "meets_psnr": bool(score >= min_psnr),
+        "tried": {c[0]: len(c[2]) for c in tried},
+    }
+
+def find_assets():
+    """Relative paths of every asset this stage encodes"""
+    paths = []
+    for folder, extensions in SOURCE_DIRS:
+        directory = os.path.join(ASSETS_DIR, folder)
+        if not os.path.isdir(directory):
+            continue
+        for f in sorted(os.listdir(directory)):
+            if f.lower().endswith(extensions):
+                paths.append(os.path.join(folder, f))
+    return paths
+
+def _output_path(rel_path, ext):
+    return os.path.join(OUTPUT_DIR, os.path.splitext(rel_path)[0] + ext)
+
+def main():
+    print("=" * 60)
+    print("WORMS PARODY - WEB ASSET ENCODING")
+    print("=" * 60)
+    print()
+
+    manifest = read_manifest(MANIFEST_PATH)
+    todo = []
+    for rel_path in find_assets():
+        params = dict(budget=BUDGETS.get(os.path.basename(rel_path), DEFAULT_BUDGET), min_psnr=MIN_PSNR)
+        entry = manifest.get(rel_path)
+        outputs = [os.path.join(OUTPUT_DIR, entry["file"])] if entry else []
+        if entry and build_cache.is_fresh(f"encode_web:{rel_path}", [os.path.join(ASSETS_DIR, rel_path)],
+                                          outputs, **params):
+            print(f"  {rel_path:45} up to date")
+            continue
+        todo.append((rel_path, params))
+
+    # Byte-identical sources (e.g. babymouthN.png / babymouthN-clean.png)
+    # with the same settings are encoded once and share the result
+    jobs = {}
+    for rel_path, params in todo:
+        source_hash = build_cache.file_hash(os.path.join(ASSETS_DIR, rel_path))
+        jobs.setdefault((source_hash, tuple(sorted(params.items()))), (rel_path, params))
+
+    # Encoding is CPU-bound and independent per asset: fan out across cores
+    with ProcessPoolExecutor() as pool:
+        futures = {job: pool.submit(encode_asset, rel_path, **params)
+                   for job, (rel_path, params) in jobs.items()}
+        for rel_path, params in todo:
+            source_hash = build_cache.file_hash(os.path.join(ASSETS_DIR, rel_path))
+            result = futures[(source_hash, tuple(sorted(params.items())))].result()
+            output_path = _output_path(rel_path, result["ext"])
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            write_asset(output_path, result["data"])
+            source_bytes = os.path.getsize(os.path.join(ASSETS_DIR, rel_path))
+            previous = manifest.get(rel_path)
+            manifest[rel_path] = {
+                "file": os.path.relpath(output_path, OUTPUT_DIR).replace(os.sep, "/"),
+                "format": result["format"],
+                "bytes": len(result["data"]),
+                "source_bytes": source_bytes,
+                "psnr": result["psnr"],
+                "within_budget": result["within_budget"],
+                "meets_psnr": result["meets_psnr"],
+                "tried": result["tried"],
+            }
+            # A different format means a different file name: drop the old
+            # one unless another asset's output now has that name
+            if previous and previous["file"] not in {e["file"] for e in manifest.values()}:
+                remove_asset(os.path.join(OUTPUT_DIR, previous["file"]))
+            build_cache.record(f"encode_web:{rel_path}", [os.path.join(ASSETS_DIR, rel_path)],
+                               [output_path], **params)
+            flag = "" if result["within_budget"] else "  OVER BUDGET"
+            if not result["meets_psnr"]:
+                flag += f"  {result['psnr']} dB (< {MIN_PSNR:g})"
+            print(f"  {rel_path:45} {source_bytes//1024:>5} KB -> {len(result['data'])//1024:>5} KB"
+                  f"  {result['format']}{flag}")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    write_asset(MANIFEST_PATH, json.dumps(manifest, indent=1, sort_keys=True).encode())
+
+    total_in = sum(e["source_bytes"] for e in manifest.values())
+    total_out = sum(e["bytes"] for e in manifest.values())
+    print()
+    print(f"  Total: {total_in//1024} KB -> {total_out//1024} KB")
+    print()
+    print("=" * 60)
+    print(f"DONE! Web assets and manifest.json in: {OUTPUT_DIR}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
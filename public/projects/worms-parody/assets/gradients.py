@@ -0,0 +1,46 @@
+"""
+Vectorized gradient kernels for the Worms Parody pipeline
+Gradient fills and alpha ramps are built as whole NumPy arrays in one
+operation instead of one ImageDraw.line call per row
+"""
+
+from PIL import Image
+import numpy as np
+
+def positions(length):
+    """Normalized position y / length of every row (or column), 0 <= t < 1"""
+    return np.arange(length) / length
+
+def fill_rows(width, rows):
+    """
+    Image whose row y is filled with rows[y]; rows is an (height, bands)
+    array of 3 (RGB) or 4 (RGBA) values, truncated to uint8
+    """
+    rows = np.ascontiguousarray(rows, dtype=np.float64).astype(np.uint8)
+    mode = "RGBA" if rows.shape[1] == 4 else "RGB"
+    # Build a 1px column and let Pillow's nearest-neighbour resize widen it:
+    # a plain C row copy, faster than broadcasting 3-byte pixels in NumPy
+    column = Image.frombytes(mode, (1, rows.shape[0]), rows.tobytes())
+    return column.resize((width, rows.shape[0]), Image.Resampling.NEAREST)
+
+def linear_ramp(length, start, end):
+    """(length, bands) colors stepping from start toward end, truncated like int()"""
+    start = np.asarray(start)
+    return (start + positions(length)[:, None] * (np.asarray(end) - start)).astype(int)
+
+def vertical_gradient(width, height, top, bottom):
+    """Top-to-bottom linear gradient (bottom is reached just past the last row)"""
+    return fill_rows(width, linear_ramp(height, top, bottom))
+
+def alpha_ramp(width, height, start, max_alpha, color=(0, 0, 0), span=None):
+    """
+    RGBA overlay of color, transparent above row start, alpha rising linearly
+    to max_alpha over span rows (default: to the bottom edge)
+    """
+    span = span or height - start
+    y = np.arange(height)
+    alpha = np.where(y >= start, max_alpha * (y - start) / span, 0).astype(int)
+    rows = np.empty((height, 4), dtype=int)
+    rows[:, :3] = color
+    rows[:, 3] = alpha
+    return fill_rows(width, rows)
@@ -0,0 +1,191 @@
+"""
+Vectorized background keying for the Worms Parody asset pipeline
+Builds alpha masks from whole-array comparisons instead of per-pixel loops
+"""
+
+from PIL import Image
+import numpy as np
+
+# Keyed-out pixels become fully transparent white
+KEYED_PIXEL = (255, 255, 255, 0)
+_KEYED_WORD = np.array(KEYED_PIXEL, dtype=np.uint8).view(np.uint32)[0]
+
+def to_rgba_array(img):
+    """Decode an image into an HxWx4 uint8 array"""
+    return np.array(img.convert("RGBA"))
+
+def white_mask(rgba, threshold=240):
+    """Mask of pixels whose R, G and B are all above threshold"""
+    rgb = rgba[..., :3]
+    return (rgb[..., 0] > threshold) & (rgb[..., 1] > threshold) & (rgb[..., 2] > threshold)
+
+def _channel_planes(rgba):
+    """Widen R, G and B to int16 planes so distances cannot overflow"""
+    return [rgba[..., i].astype(np.int16) for i in range(3)]
+
+def color_mask(rgba, target_color, tolerance=40, planes=None):
+    """
+    Mask of pixels whose summed RGB distance to target_color is below
+    tolerance * 3. planes reuses channels already widened by _channel_planes.
+    """
+    if planes is None:
+        planes = _channel_planes(rgba)
+    diff = np.abs(planes[0] - int(target_color[0]))
+    diff += np.abs(planes[1] - int(target_color[1]))
+    diff += np.abs(planes[2] - int(target_color[2]))
+    return diff < tolerance * 3
+
+def background_mask(rgba, color_keys=(), white_thresholds=()):
+    """
+    Combined mask for several keys at once.
+    color_keys is a list of ((r, g, b), tolerance) pairs, white_thresholds a
+    list of near-white thresholds. The channels are widened once and shared,
+    so each extra key only costs a few in-place array ops.
+    """
+    mask = np.zeros(rgba.shape[:2], dtype=bool)
+    for threshold in white_thresholds:
+        mask |= white_mask(rgba, threshold)
+    if color_keys:
+        planes = _channel_planes(rgba)
+        for target_color, tolerance in color_keys:
+            mask |= color_mask(rgba, target_color, tolerance, planes)
+    return mask
+
+def apply_mask(rgba, mask):
+    """Replace masked pixels with transparent white and return an RGBA image"""
+    # Write whole RGBA pixels as single 32-bit words
+    np.putmask(rgba.view(np.uint32)[..., 0], mask, _KEYED_WORD)
+    return Image.fromarray(rgba, "RGBA")
+
+def key_background(img, color_keys=(), white_thresholds=()):
+    """
+    Key out every listed background in one decode and one rebuild.
+    Equivalent to chaining remove_color_background / remove_white_background
+    calls, since keyed pixels never become unkeyed.
+    """
+    rgba = to_rgba_array(img)
+    return apply_mask(rgba, background_mask(rgba, color_keys, white_thresholds))
+
+def _border_ring(a, width):
+    """Flatten the outer ring (width px) of a 2D or 3D array"""
+    return np.concatenate([
+        a[:width].reshape(-1, *a.shape[2:]),
+        a[-width:].reshape(-1, *a.shape[2:]),
+        a[width:-width, :width].reshape(-1, *a.shape[2:]),
+        a[width:-width, -width:].reshape(-1, *a.shape[2:]),
+    ])
+
+def _border_width(rgba):
+    return max(2, min(rgba.shape[:2]) // 50)
+
+def estimate_background(rgba, min_tolerance=15, max_tolerance=60):
+    """
+    Guess the backdrop as a ((r, g, b), tolerance) key from the opaque
+    pixels in the image's outer ring: median color, tolerance from their
+    spread. None if the border is mostly transparent already.
+    """
+    ring = _border_ring(rgba, _border_width(rgba))
+    opaque = ring[ring[:, 3] > 0][:, :3].astype(np.int16)
+    if len(opaque) < len(ring) // 2:
+        return None
+    color = np.median(opaque, axis=0)
+    spread = np.abs(opaque - color).sum(axis=1).mean() / 3
+    tolerance = int(np.clip(spread * 3 + 10, min_tolerance, max_tolerance))
+    return tuple(int(c) for c in color), tolerance
+
+def key_confidence(rgba, mask):
+    """
+    Score a keying mask with cheap metrics:
+    border_cleared - fraction of the outer ring removed (backdrops touch the edges)
+    coverage       - fraction of the image kept as foreground
+    edge_ratio     - image gradient on the cut line vs. the image average
+                     (a good cut follows real edges)
+    compactness    - cut length vs. the perimeter of a circle of the same
+                     area (speckled, noisy masks score high)
+    """
+    keep = ~mask & (rgba[..., 3] > 0)
+    ring = _border_ring(mask | (rgba[..., 3] == 0), _border_width(rgba))
+    coverage = float(keep.mean())
+
+    luma = rgba[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    grad = np.zeros_like(luma)
+    grad[:, :-1] += np.abs(np.diff(luma, axis=1))
+    grad[:-1, :] += np.abs(np.diff(luma, axis=0))
+
+    cut = np.zeros_like(keep)
+    cut[:, :-1] |= keep[:, :-1] != keep[:, 1:]
+    cut[:-1, :] |= keep[:-1, :] != keep[1:, :]
+    cut_len = int(cut.sum())
+
+    mean_grad = float(grad.mean()) or 1.0
+    edge_ratio = float(grad[cut].mean()) / mean_grad if cut_len else 0.0
+    area = int(keep.sum())
+    compactness = cut_len / (2 * np.sqrt(np.pi * area)) if area else float("inf")
+    return {
+        "border_cleared": float(ring.mean()),
+        "coverage": coverage,
+        "edge_ratio": edge_ratio,
+        "compactness": float(compactness),
+    }
+
+def is_confident(metrics, min_border=0.9, coverage_range=(0.05, 0.9),
+                 min_edge_ratio=1.5, max_compactness=8.0):
+    """True when a keying result is trustworthy enough to skip the AI model"""
+    return (metrics["border_cleared"] >= min_border
+            and coverage_range[0] <= metrics["coverage"] <= coverage_range[1]
+            and metrics["edge_ratio"] >= min_edge_ratio
+            and metrics["compactness"] <= max_compactness)
+
+def auto_key(img):
+    """
+    Key out a backdrop estimated from the border.
+    Returns (image or None, metrics, key); the image is None when no
+    backdrop could be estimated (border already transparent).
+    """
+    rgba = to_rgba_array(img)
+    key = estimate_background(rgba)
+    if key is None:
+        return None, None, None
+    mask = background_mask(rgba, color_keys=[key])
+    metrics = key_confidence(rgba, mask)
+    return apply_mask(rgba, mask), metrics, key
+
+def joint_bilateral_upsample(mask, guide, sigma_range=0.05, reach=2, band=(0.02, 0.98)):
+    """
+    Upsample a low-res L mask to guide's size along the full-res image's
+    edges (joint bilateral upsampling, Kopf et al. 2007): each output pixel
+    averages the nearby low-res mask samples, weighted by distance and by how
+    close the guide color under each sample is to its own color, so hair and
+    jaw lines follow real detail instead of the blurry upscale.
+    Only pixels the bilinear upscale leaves inside band are refined; solid
+    foreground and background are already right.
+    """
+    big_w, big_h = guide.size
+    w, h = mask.size
+    rgb = guide.convert("RGB")
+    low_mask = np.asarray(mask, dtype=np.float32) / 255
+    low_rgb = np.asarray(rgb.resize(mask.size, Image.Resampling.BOX), dtype=np.float32) / 255
+    out = np.asarray(mask.resize(guide.size, Image.Resampling.BILINEAR), dtype=np.float32) / 255
+
+    ys, xs = np.nonzero((out > band[0]) & (out < band[1]))
+    color = np.asarray(rgb, dtype=np.float32)[ys, xs] / 255
+    # Sample-space position of each refined pixel
+    fy = (ys + 0.5) * h / big_h - 0.5
+    fx = (xs + 0.5) * w / big_w - 0.5
+    cy = np.floor(fy).astype(np.intp)
+    cx = np.floor(fx).astype(np.intp)
+
+    total = np.zeros(len(ys), dtype=np.float32)
+    weight = np.zeros(len(ys), dtype=np.float32)
+    for dy in range(1 - reach, reach + 1):
+        for dx in range(1 - reach, reach + 1):
+            qy = np.clip(cy + dy, 0, h - 1)
+            qx = np.clip(cx + dx, 0, w - 1)
+            spatial = np.exp(-((qy - fy) ** 2 + (qx - fx) ** 2) / (reach * reach / 2))
+            similar = np.exp(-((low_rgb[qy, qx] - color) ** 2).sum(axis=1) / (2 * sigma_range ** 2))
+            wt = spatial * similar
+            total += wt * low_mask[qy, qx]
+            weight += wt
+    # Pixels unlike every nearby sample keep the bilinear value
+    out[ys, xs] = np.where(weight > 1e-6, total / np.maximum(weight, 1e-6), out[ys, xs])
+    return Image.fromarray((out * 255 + 0.5).astype(np.uint8), "L")
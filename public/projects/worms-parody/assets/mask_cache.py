@@ -0,0 +1,71 @@
+"""
+Persistent alpha-mask cache for AI background removal
+The segmentation model is the expensive step, so its alpha mask is kept on
+its own, keyed by source content hash and model name. Crop, feather or
+encoder changes then rebuild from the cached mask in milliseconds.
+
+Masks are stored as 8-bit L PNGs: they are mostly long runs of 0 and 255,
+which deflate to a few KB.
+"""
+
+from PIL import Image
+import os
+import re
+
+import build_cache
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+MASK_DIR = os.path.join(ASSETS_DIR, ".mask-cache")
+
+# rembg model the masks default to (process_assets_ai.MODEL_NAME)
+DEFAULT_MODEL = "u2net"
+
+def model_key(model=DEFAULT_MODEL, max_side=None):
+    """Cache key for masks model inferred at max_side px (None: full size)"""
+    # Masks inferred at reduced size are cached apart from full-size ones
+    return f"{model}-{max_side}px" if max_side else model
+
+def mask_path(source_path, model=DEFAULT_MODEL):
+    """Where the mask for this source content and model lives"""
+    return os.path.join(MASK_DIR, f"{build_cache.file_hash(source_path)}-{model}.png")
+
+def find_mask(source_path, model=DEFAULT_MODEL, any_size=False):
+    """
+    Path of the cached mask, or None if the model never ran on this source.
+    With any_size, a mask inferred at reduced size (the largest one) is
+    returned when there is no full-size one.
+    """
+    path = mask_path(source_path, model)
+    if os.path.exists(path):
+        return path
+    if not any_size or not os.path.isdir(MASK_DIR):
+        return None
+    prefix = f"{build_cache.file_hash(source_path)}-{model}-"
+    sizes = [int(m.group(1)) for f in os.listdir(MASK_DIR)
+             if f.startswith(prefix) and (m := re.fullmatch(r"(\d+)px\.png", f[len(prefix):]))]
+    return mask_path(source_path, model_key(model, max(sizes))) if sizes else None
+
+def load_mask(source_path, model=DEFAULT_MODEL, any_size=False):
+    """Cached mask as an L image, or None"""
+    path = find_mask(source_path, model, any_size)
+    if path is None:
+        return None
+    mask = Image.open(path)
+    mask.load()
+    return mask
+
+def store_mask(source_path, mask, model=DEFAULT_MODEL):
+    """Cache a mask (L image, or the alpha of an RGBA cutout)"""
+    if mask.mode == "RGBA":
+        mask = mask.getchannel("A")
+    path = mask_path(source_path, model)
+    os.makedirs(MASK_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    mask.convert("L").save(tmp_path, "PNG", optimize=True)
+    os.replace(tmp_path, path)
+    return path
+
+def apply_mask(img, mask):
+    """Cut img out with mask the way rembg does: composite over transparent"""
+    img = img.convert("RGBA")
+    return Image.composite(img, Image.new("RGBA", img.size, (0, 0, 0, 0)), mask)
@@ -0,0 +1,196 @@
+"""
+Texture atlas packer for Worms Parody animation sprites
+Packs the worm expressions, Dune worms and instruments into a few
+power-of-two atlases plus a JSON frame map (MaxRects, best short side fit)
+"""
+
+from PIL import Image
+import glob
+import json
+import os
+
+import build_cache
+from asset_index import save_image, write_asset
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+ANIMATION_DIR = os.path.join(ASSETS_DIR, "animation-ready")
+OUTPUT_DIR = os.path.join(ANIMATION_DIR, "atlas")
+MAP_PATH = os.path.join(OUTPUT_DIR, "sprites.json")
+
+# Sprite sources, as globs relative to ASSETS_DIR
+SPRITE_GLOBS = [
+    "animation-ready/worm-*.png",                # create_worm_character_sheet
+    "animation-ready/dune-worm-babymouth*.png",  # composite_baby_mouth_worm
+    "animation-ready/DUNE-WORM-GIANT.png",
+    "Instruments/*.png",
+]
+# The character sheet is a reference image, not a sprite
+EXCLUDE = {"worm-character-sheet.png"}
+
+MAX_ATLAS_SIZE = 2048
+PADDING = 2  # Transparent gutter around each sprite to stop bleeding
+
+class MaxRectsBin:
+    """A single atlas page tracking its maximal free rectangles"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = [(0, 0, width, height)]
+        self.used_w = 0
+        self.used_h = 0
+
+    def insert(self, w, h):
+        """Place a w x h rect; returns (x, y) or None if it does not fit"""
+        best = None
+        best_score = None
+        for fx, fy, fw, fh in self.free:
+            if w <= fw and h <= fh:
+                # Best short side fit, ties broken by long side
+                leftover = sorted((fw - w, fh - h))
+                if best_score is None or leftover < best_score:
+                    best, best_score = (fx, fy), leftover
+        if best is None:
+            return None
+        self._split((best[0], best[1], w, h))
+        self.used_w = max(self.used_w, best[0] + w)
+        self.used_h = max(self.used_h, best[1] + h)
+        return best
+
+    def _split(self, placed):
+        px, py, pw, ph = placed
+        new_free = []
+        for fx, fy, fw, fh in self.free:
+            if px >= fx + fw or px + pw <= fx or py >= fy + fh or py + ph <= fy:
+                new_free.append((fx, fy, fw, fh))
+                continue
+            # Keep the parts of the free rect not covered by the placed rect
+            if px > fx:
+                new_free.append((fx, fy, px - fx, fh))
+            if px + pw < fx + fw:
+                new_free.append((px + pw, fy, fx + fw - px - pw, fh))
+            if py > fy:
+                new_free.append((fx, fy, fw, py - fy))
+            if py + ph < fy + fh:
+                new_free.append((fx, py + ph, fw, fy + fh - py - ph))
+        # Drop free rects fully contained in another
+        self.free = [
+            a for i, a in enumerate(new_free)
+            if not any(
+                i != j and b[0] <= a[0] and b[1] <= a[1]
+                and a[0] + a[2] <= b[0] + b[2] and a[1] + a[3] <= b[1] + b[3]
+                and (a != b or j < i)
+                for j, b in enumerate(new_free)
+            )
+        ]
+
+def next_pow2(n):
+    """Smallest power of two >= n"""
+    size = 1
+    while size < n:
+        size *= 2
+    return size
+
+def find_sprites():
+    """Absolute paths of every sprite to pack"""
+    paths = []
+    for pattern in SPRITE_GLOBS:
+        for path in sorted(glob.glob(os.path.join(ASSETS_DIR, pattern))):
+            if os.path.basename(path) not in EXCLUDE:
+                paths.append(path)
+    return paths
+
+def pack_sprites(paths, max_size=MAX_ATLAS_SIZE, padding=PADDING):
+    """
+    Trim and pack sprites; returns (atlas images, frame map).
+    Frames record where each trimmed sprite sits in its atlas and where the
+    trimmed rect sat in the original image, so drawing code can restore it.
+    """
+    sprites = []
+    for path in paths:
+        img = Image.open(path).convert("RGBA")
+        bbox = img.getbbox() or (0, 0, 1, 1)
+        sprites.append((os.path.splitext(os.path.basename(path))[0], img, bbox))
+
+    # Largest first packs tighter
+    sprites.sort(key=lambda s: max(s[2][2] - s[2][0], s[2][3] - s[2][1]), reverse=True)
+
+    bins = []
+    frames = {}
+    for name, img, bbox in sprites:
+        w = bbox[2] - bbox[0] + padding * 2
+        h = bbox[3] - bbox[1] + padding * 2
+        if w > max_size or h > max_size:
+            raise ValueError(f"{name} ({w}x{h}) does not fit a {max_size}px atlas")
+        for index, page in enumerate(bins):
+            spot = page.insert(w, h)
+            if spot:
+                break
+        else:
+            bins.append(MaxRectsBin(max_size, max_size))
+            index, spot = len(bins) - 1, bins[-1].insert(w, h)
+        frames[name] = {
+            "atlas": index,
+            "x": spot[0] + padding,
+            "y": spot[1] + padding,
+            "w": bbox[2] - bbox[0],
+            "h": bbox[3] - bbox[1],
+            "offsetX": bbox[0],
+            "offsetY": bbox[1],
+            "sourceW": img.width,
+            "sourceH": img.height,
+            "_img": img.crop(bbox),
+        }
+
+    # Shrink each page to the smallest power-of-two size that holds its sprites
+    atlases = [Image.new("RGBA", (next_pow2(b.used_w), next_pow2(b.used_h)), (0, 0, 0, 0)) for b in bins]
+    for frame in frames.values():
+        atlases[frame["atlas"]].paste(frame.pop("_img"), (frame["x"], frame["y"]))
+    return atlases, frames
+
+def _output_paths():
+    """The sprite map plus every atlas page it lists"""
+    try:
+        with open(MAP_PATH) as f:
+            pages = json.load(f)["atlases"]
+    except (OSError, ValueError, KeyError):
+        return [MAP_PATH]
+    return [MAP_PATH] + [os.path.join(OUTPUT_DIR, page["image"]) for page in pages]
+
+def main():
+    print("=" * 60)
+    print("WORMS PARODY - SPRITE ATLAS PACKING")
+    print("=" * 60)
+    print()
+
+    paths = find_sprites()
+    if not paths:
+        print("  No sprites found!")
+        return
+    params = dict(max_size=MAX_ATLAS_SIZE, padding=PADDING)
+    if build_cache.is_fresh("pack_atlas", paths, _output_paths(), **params):
+        print(f"  Up to date: {MAP_PATH}")
+        return
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    atlases, frames = pack_sprites(paths, **params)
+
+    pages = []
+    for i, atlas in enumerate(atlases):
+        filename = f"sprites-{i}.png"
+        save_image(atlas, os.path.join(OUTPUT_DIR, filename))
+        pages.append({"image": filename, "width": atlas.width, "height": atlas.height})
+        print(f"  Saved: {filename} ({atlas.width}x{atlas.height})")
+
+    sprite_map = {"atlases": pages, "padding": PADDING, "frames": frames}
+    write_asset(MAP_PATH, json.dumps(sprite_map, indent=1, sort_keys=True).encode())
+    build_cache.record("pack_atlas", paths, _output_paths(), **params)
+    print(f"  Saved: sprites.json ({len(frames)} frames in {len(pages)} atlas(es))")
+
+    print()
+    print("=" * 60)
+    print(f"DONE! Atlases saved to: {OUTPUT_DIR}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Streaming PNG encoder for the Worms Parody pipeline
+Writes an image delivered as row bands straight to disk, filtering and
+deflating each band as it arrives, so images far larger than memory (the
+tiled giant worm renders) never exist in full. The result is indexed in
+the folder's asset-index.json like any other saved asset.
+"""
+
+import hashlib
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from asset_index import store_entry
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def _filter_rows(rows, prev, bpp):
+    """
+    PNG-filter a block of rows, picking None, Sub or Up per row by the
+    smallest sum of absolute residuals (the usual adaptive heuristic)
+    """
+    above = np.vstack([prev[None], rows[:-1]])
+    sub = rows.copy()
+    sub[:, bpp:] -= rows[:, :-bpp]
+    candidates = np.stack([rows, sub, rows - above])
+    cost = np.abs(candidates.view(np.int8).astype(np.int32)).sum(axis=2)
+    best = cost.argmin(axis=0)
+    out = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = best
+    out[:, 1:] = candidates[best, np.arange(rows.shape[0])]
+    return out
+
+def save_png_stream(path, size, mode, bands, compress_level=6):
+    """
+    Encode an image delivered as full-width row bands (top to bottom) as a
+    PNG, compressing and writing each band as it arrives, so only one band
+    is ever in memory. Indexed like save_image, without pixel-key aliasing
+    (the full pixels never exist to key).
+    """
+    width, height = size
+    bpp = {"RGB": 3, "RGBA": 4}[mode]
+    digest = hashlib.sha256()
+    written = 0
+    rows_done = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        def emit(data):
+            nonlocal written
+            f.write(data)
+            digest.update(data)
+            written += len(data)
+
+        emit(b"\x89PNG\r\n\x1a\n")
+        emit(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6 if mode == "RGBA" else 2, 0, 0, 0)))
+        compressor = zlib.compressobj(compress_level)
+        prev = np.zeros(width * bpp, dtype=np.uint8)
+        pending = bytearray()
+        for band in bands:
+            if band.size[0] != width or band.mode != mode:
+                raise ValueError(f"band {band.size} {band.mode} does not match {size} {mode}")
+            rows = np.asarray(band).reshape(band.size[1], width * bpp)
+            pending += compressor.compress(_filter_rows(rows, prev, bpp).tobytes())
+            prev = rows[-1].copy()
+            rows_done += band.size[1]
+            if len(pending) >= 1 << 20:
+                emit(_png_chunk(b"IDAT", bytes(pending)))
+                pending.clear()
+        pending += compressor.flush()
+        emit(_png_chunk(b"IDAT", bytes(pending)))
+        emit(_png_chunk(b"IEND", b""))
+    if rows_done != height:
+        os.remove(tmp_path)
+        raise ValueError(f"got {rows_done} rows for a {height}-row image")
+    os.replace(tmp_path, path)
+    return store_entry(path, {"bytes": written, "sha256": digest.hexdigest(),
+                              "width": width, "height": height, "mode": mode})
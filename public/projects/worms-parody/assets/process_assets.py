@@ -1,46 +1,43 @@
 """
 Asset Processing Script for Worms Parody
 Processes head cutouts and prepares them for animation
+Heads use the cached AI mask when process_assets_ai.py has produced one,
+and fall back to color keying otherwise
 """
 
 from PIL import Image
 import os
 
+import build_cache
+from asset_index import save_image, list_assets
+import mask_cache
+from keying import key_background
+
 ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
 HEADS_DIR = os.path.join(ASSETS_DIR, "heads")
 OUTPUT_DIR = os.path.join(ASSETS_DIR, "processed")
 
+# Background keys for Jayhead.png: ((r, g, b), tolerance)
+JAY_BACKGROUND_KEYS = [
+    ((210, 195, 170), 35),  # Beige/tan backdrop
+    ((140, 60, 60), 30),    # Reddish areas at edges
+]
+
 # Create output directory
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 def remove_white_background(img, threshold=240):
     """Remove white/near-white background and make transparent"""
-    img = img.convert("RGBA")
-    data = img.getdata()
-    new_data = []
-    for item in data:
-        # If pixel is white-ish, make transparent
-        if item[0] > threshold and item[1] > threshold and item[2] > threshold:
-            new_data.append((255, 255, 255, 0))
-        else:
-            new_data.append(item)
-    img.putdata(new_data)
-    return img
+    return key_background(img, white_thresholds=[threshold])
 
 def remove_color_background(img, target_color, tolerance=40):
     """Remove a specific color background"""
-    img = img.convert("RGBA")
-    data = img.getdata()
-    new_data = []
-    for item in data:
-        # Check if pixel is close to target color
-        diff = sum(abs(item[i] - target_color[i]) for i in range(3))
-        if diff < tolerance * 3:
-            new_data.append((255, 255, 255, 0))
-        else:
-            new_data.append(item)
-    img.putdata(new_data)
-    return img
+    return key_background(img, color_keys=[(target_color, tolerance)])
+
+def head_inputs(img_path):
+    """Build-cache inputs for a head: source, code, and its AI mask if cached"""
+    cached = mask_cache.find_mask(img_path, any_size=True)
+    return [img_path] + ([cached] if cached else [])
 
 def crop_to_content(img, padding=10):
     """Crop image to non-transparent content with padding"""
@@ -62,15 +59,26 @@ def process_rfk_head():
     """Process RFK Jr face - already mostly cut out"""
     print("Processing RFK head...")
     img_path = os.path.join(HEADS_DIR, "RFKJrface.jpg")
+    output_path = os.path.join(OUTPUT_DIR, "rfk-head-clean.png")
+    params = dict(threshold=245, padding=5)
     if os.path.exists(img_path):
+        inputs = head_inputs(img_path)
+        if build_cache.is_fresh("process_rfk_head", inputs, [output_path], **params):
+            print(f"  Up to date: {output_path}")
+            return None
         img = Image.open(img_path)
-        # Remove white background
-        img = remove_white_background(img, threshold=245)
+        mask = mask_cache.load_mask(img_path, any_size=True)
+        if mask is not None:
+            # Reuse the mask process_assets_ai.py cached
+            img = mask_cache.apply_mask(img, mask)
+        else:
+            # Remove white background
+            img = remove_white_background(img, threshold=params["threshold"])
         # Crop to content
-        img = crop_to_content(img, padding=5)
+        img = crop_to_content(img, padding=params["padding"])
         # Save
-        output_path = os.path.join(OUTPUT_DIR, "rfk-head-clean.png")
-        img.save(output_path, "PNG")
+        save_image(img, output_path)
+        build_cache.record("process_rfk_head", inputs, [output_path], **params)
         print(f"  Saved: {output_path} ({img.size[0]}x{img.size[1]})")
         return img
     else:
@@ -81,18 +89,26 @@ def process_jay_head():
     """Process Jay Bhattacharya head - needs background removal"""
     print("Processing Jay head...")
     img_path = os.path.join(HEADS_DIR, "Jayhead.png")
+    output_path = os.path.join(OUTPUT_DIR, "jay-head-clean.png")
+    params = dict(color_keys=JAY_BACKGROUND_KEYS, padding=5)
     if os.path.exists(img_path):
+        inputs = head_inputs(img_path)
+        if build_cache.is_fresh("process_jay_head", inputs, [output_path], **params):
+            print(f"  Up to date: {output_path}")
+            return None
         img = Image.open(img_path)
-        # The background looks beige/tan - try to remove it
-        # Approximate beige color: RGB(210, 195, 170)
-        img = remove_color_background(img, (210, 195, 170), tolerance=35)
-        # Also try to catch the reddish areas at edges
-        img = remove_color_background(img, (140, 60, 60), tolerance=30)
+        mask = mask_cache.load_mask(img_path, any_size=True)
+        if mask is not None:
+            # Reuse the mask process_assets_ai.py cached
+            img = mask_cache.apply_mask(img, mask)
+        else:
+            # Remove the beige/tan backdrop and the reddish edges in one pass
+            img = key_background(img, color_keys=params["color_keys"])
         # Crop to content
-        img = crop_to_content(img, padding=5)
+        img = crop_to_content(img, padding=params["padding"])
         # Save
-        output_path = os.path.join(OUTPUT_DIR, "jay-head-clean.png")
-        img.save(output_path, "PNG")
+        save_image(img, output_path)
+        build_cache.record("process_jay_head", inputs, [output_path], **params)
         print(f"  Saved: {output_path} ({img.size[0]}x{img.size[1]})")
         return img
     else:
@@ -106,12 +122,17 @@ def process_baby_mouths():
 
     for i in range(1, 6):
         img_path = os.path.join(HEADS_DIR, f"babymouth{i}.png")
+        output_path = os.path.join(OUTPUT_DIR, f"babymouth{i}-clean.png")
+        stage = f"process_baby_mouths:{i}"
         if os.path.exists(img_path):
+            if build_cache.is_fresh(stage, [img_path], [output_path]):
+                print(f"  Up to date: {output_path}")
+                continue
             img = Image.open(img_path)
             img = img.convert("RGBA")
             # These are already cropped pretty well, just ensure RGBA
-            output_path = os.path.join(OUTPUT_DIR, f"babymouth{i}-clean.png")
-            img.save(output_path, "PNG")
+            save_image(img, output_path)
+            build_cache.record(stage, [img_path], [output_path])
             print(f"  Saved: {output_path} ({img.size[0]}x{img.size[1]})")
             processed.append(img)
         else:
@@ -123,11 +144,15 @@ def process_rfk_mouth():
     """Process RFK mouth for lip sync"""
     print("Processing RFK mouth...")
     img_path = os.path.join(ASSETS_DIR, "RFKmouth.png")
+    output_path = os.path.join(OUTPUT_DIR, "rfk-mouth-clean.png")
     if os.path.exists(img_path):
+        if build_cache.is_fresh("process_rfk_mouth", [img_path], [output_path]):
+            print(f"  Up to date: {output_path}")
+            return None
         img = Image.open(img_path)
         img = img.convert("RGBA")
-        output_path = os.path.join(OUTPUT_DIR, "rfk-mouth-clean.png")
-        img.save(output_path, "PNG")
+        save_image(img, output_path)
+        build_cache.record("process_rfk_mouth", [img_path], [output_path])
         print(f"  Saved: {output_path} ({img.size[0]}x{img.size[1]})")
         return img
     else:
@@ -140,10 +165,8 @@ def create_asset_summary():
 
 ## Heads (for animation)
 """
-    for f in os.listdir(OUTPUT_DIR):
-        if f.endswith('.png'):
-            img = Image.open(os.path.join(OUTPUT_DIR, f))
-            summary += f"- **{f}**: {img.size[0]}x{img.size[1]} px\n"
+    for f, meta in list_assets(OUTPUT_DIR, [".png"]):
+        summary += f"- **{f}**: {meta['width']}x{meta['height']} px\n"
 
     summary += """
 ## Recommended Usage
@@ -169,7 +192,7 @@ def create_asset_summary():
         f.write(summary)
     print(f"\nSummary saved to: {os.path.join(OUTPUT_DIR, 'ASSET-SUMMARY.md')}")
 
-if __name__ == "__main__":
+def main():
     print("=" * 50)
     print("WORMS PARODY - ASSET PROCESSING")
     print("=" * 50)
@@ -187,3 +210,6 @@ if __name__ == "__main__":
     print("=" * 50)
     print("DONE! Check the 'processed' folder for cleaned assets.")
     print("=" * 50)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,25 @@
 """
 Asset Processing Script with AI Background Removal
+
+Alpha masks from the model are cached by source hash and model name
+(mask_cache), so reruns skip inference. With --tiered, each image is first
+color-keyed against a backdrop estimated from its border; only results that
+fail the confidence checks go to rembg. With --max-side=N, inference runs on
+a copy downscaled to N px and the mask is upsampled guided by the full image.
+
+Usage: python process_assets_ai.py [--tiered] [--max-side=N]
 """
 
-from rembg import remove
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
+from rembg import new_session, remove
 import os
+import sys
+
+import build_cache
+import keying
+import mask_cache
+from asset_index import save_image, load_image, list_assets
 
 ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
 HEADS_DIR = os.path.join(ASSETS_DIR, "heads")
@@ -12,54 +27,183 @@ OUTPUT_DIR = os.path.join(ASSETS_DIR, "processed")
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def remove_bg_ai(input_path, output_path):
-    """Remove background using AI (rembg)"""
-    print(f"  Processing: {os.path.basename(input_path)}")
-    with open(input_path, 'rb') as f:
-        input_data = f.read()
-    output_data = remove(input_data)
-    with open(output_path, 'wb') as f:
-        f.write(output_data)
-    img = Image.open(output_path)
+# rembg segmentation model
+MODEL_NAME = mask_cache.DEFAULT_MODEL
+
+# Longest side (px) inference runs at; None runs at source resolution
+INFERENCE_MAX_SIDE = None
+
+# One rembg session per model per process: the ONNX model is resolved and
+# loaded once, then reused for every image
+_sessions = {}
+
+def get_session(model_name=MODEL_NAME):
+    """Return this process's long-lived rembg session for model_name"""
+    if model_name not in _sessions:
+        _sessions[model_name] = new_session(model_name)
+    return _sessions[model_name]
+
+def _remove_file(input_path, model_name=MODEL_NAME, max_side=None):
+    """
+    Run rembg on one file with the shared session. The image is decoded once
+    and handed over as an Image, so rembg returns an Image too instead of
+    re-encoding PNG bytes we would only decode again.
+    Sources larger than max_side are segmented at that size; the mask is
+    brought back to full size with keying.joint_bilateral_upsample.
+    """
+    img = load_image(input_path)
+    scale = max_side / max(img.size) if max_side else 1
+    if scale >= 1:
+        return remove(img, session=get_session(model_name))
+    small_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    small = img.resize(small_size, Image.Resampling.LANCZOS)
+    mask = remove(small, session=get_session(model_name)).getchannel("A")
+    return mask_cache.apply_mask(img, keying.joint_bilateral_upsample(mask, img))
+
+def _cached_cutout(input_path, model_name=MODEL_NAME, max_side=None):
+    """Cutout rebuilt from a cached mask, or None if the model has to run"""
+    mask = mask_cache.load_mask(input_path, mask_cache.model_key(model_name, max_side))
+    if mask is None:
+        return None
+    return mask_cache.apply_mask(load_image(input_path), mask)
+
+def _stage(output_path):
+    return f"remove_bg_ai:{os.path.basename(output_path)}"
+
+def _params(model_name, tiered=False, max_side=None):
+    # Tiered results may come from the color key, so they are cached apart
+    params = dict(model=model_name)
+    if tiered:
+        params["tiered"] = True
+    if max_side:
+        params["max_side"] = max_side
+    return params
+
+def _save_result(input_path, output_path, img, params):
+    save_image(img, output_path)
+    build_cache.record(_stage(output_path), [input_path], [output_path], **params)
     print(f"    -> {os.path.basename(output_path)} ({img.size[0]}x{img.size[1]})")
     return img
 
-def main():
+def try_color_key(input_path):
+    """
+    Fast tier: key out the border-estimated backdrop.
+    Returns the keyed image if it passes keying.is_confident, else None.
+    """
+    img, metrics, key = keying.auto_key(load_image(input_path))
+    if img is None:
+        print(f"    {os.path.basename(input_path)}: border already transparent, needs AI")
+        return None
+    scores = ", ".join(f"{name} {value:.2f}" for name, value in metrics.items())
+    if keying.is_confident(metrics):
+        print(f"    {os.path.basename(input_path)}: color key {key[0]} +/-{key[1]} ({scores})")
+        return img
+    print(f"    {os.path.basename(input_path)}: low confidence, needs AI ({scores})")
+    return None
+
+def remove_bg_ai(input_path, output_path, model_name=MODEL_NAME, max_side=INFERENCE_MAX_SIDE):
+    """Remove background using AI (rembg)"""
+    print(f"  Processing: {os.path.basename(input_path)}")
+    params = _params(model_name, max_side=max_side)
+    if build_cache.is_fresh(_stage(output_path), [input_path], [output_path], **params):
+        print(f"    -> {os.path.basename(output_path)} (up to date)")
+        return None
+    img = _cached_cutout(input_path, model_name, max_side)
+    if img is None:
+        img = _remove_file(input_path, model_name, max_side)
+        mask_cache.store_mask(input_path, img, mask_cache.model_key(model_name, max_side))
+    return _save_result(input_path, output_path, img, params)
+
+def remove_bg_batch(jobs, model_name=MODEL_NAME, workers=None, tiered=False, max_side=INFERENCE_MAX_SIDE):
+    """
+    Remove backgrounds for many (input_path, output_path) pairs.
+    Up-to-date outputs are skipped; the rest are spread over a process pool
+    whose workers each create their session once at startup, so model setup
+    is paid once per core instead of once per image. With a single worker
+    everything runs in-process on the shared session.
+    Sources with a cached mask never reach the model. If tiered, confident
+    color-key results are saved straight away too.
+    """
+    params = _params(model_name, tiered, max_side)
+    todo = []
+    results = []
+    for input_path, output_path in jobs:
+        if build_cache.is_fresh(_stage(output_path), [input_path], [output_path], **params):
+            print(f"  {os.path.basename(input_path)} -> {os.path.basename(output_path)} (up to date)")
+            continue
+        img = _cached_cutout(input_path, model_name, max_side)
+        if img is not None:
+            print(f"  {os.path.basename(input_path)}: cached {model_name} mask")
+        elif tiered:
+            img = try_color_key(input_path)
+        if img is not None:
+            results.append(_save_result(input_path, output_path, img, params))
+        else:
+            todo.append((input_path, output_path))
+    if not todo:
+        return results
+
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    inputs = [input_path for input_path, _ in todo]
+    if workers == 1:
+        outputs = (_remove_file(path, model_name, max_side) for path in inputs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(workers, initializer=get_session, initargs=(model_name,))
+        outputs = pool.map(_remove_file, inputs, [model_name] * len(inputs), [max_side] * len(inputs))
+    try:
+        for (input_path, output_path), img in zip(todo, outputs):
+            print(f"  Processed: {os.path.basename(input_path)}")
+            mask_cache.store_mask(input_path, img, mask_cache.model_key(model_name, max_side))
+            results.append(_save_result(input_path, output_path, img, params))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+def main(tiered=False, max_side=INFERENCE_MAX_SIDE):
     print("=" * 60)
     print("WORMS PARODY - AI ASSET PROCESSING")
     print("=" * 60)
     print()
 
-    # Process RFK head
-    print("Processing RFK Jr head...")
-    rfk_path = os.path.join(HEADS_DIR, "RFKJrface.jpg")
-    if os.path.exists(rfk_path):
-        remove_bg_ai(rfk_path, os.path.join(OUTPUT_DIR, "rfk-head-clean.png"))
-
-    # Process Jay head
-    print("\nProcessing Jay Bhattacharya head...")
-    jay_path = os.path.join(HEADS_DIR, "Jayhead.png")
-    if os.path.exists(jay_path):
-        remove_bg_ai(jay_path, os.path.join(OUTPUT_DIR, "jay-head-clean.png"))
+    # Process RFK Jr and Jay Bhattacharya heads in one batch
+    print("Processing heads...")
+    heads = [
+        ("RFKJrface.jpg", "rfk-head-clean.png"),
+        ("Jayhead.png", "jay-head-clean.png"),
+    ]
+    jobs = [(os.path.join(HEADS_DIR, src), os.path.join(OUTPUT_DIR, dst))
+            for src, dst in heads if os.path.exists(os.path.join(HEADS_DIR, src))]
+    remove_bg_batch(jobs, tiered=tiered, max_side=max_side)
 
     # Process RFK mouth
     print("\nProcessing RFK mouth...")
     mouth_path = os.path.join(ASSETS_DIR, "RFKmouth.png")
+    output_path = os.path.join(OUTPUT_DIR, "rfk-mouth.png")
     if os.path.exists(mouth_path):
-        # Just convert to RGBA, keep as is (it's already a mouth closeup)
-        img = Image.open(mouth_path).convert("RGBA")
-        output_path = os.path.join(OUTPUT_DIR, "rfk-mouth.png")
-        img.save(output_path, "PNG")
-        print(f"  -> rfk-mouth.png ({img.size[0]}x{img.size[1]})")
+        if build_cache.is_fresh("ai:rfk-mouth", [mouth_path], [output_path]):
+            print("  -> rfk-mouth.png (up to date)")
+        else:
+            # Just convert to RGBA, keep as is (it's already a mouth closeup)
+            img = load_image(mouth_path, "RGBA")
+            save_image(img, output_path)
+            build_cache.record("ai:rfk-mouth", [mouth_path], [output_path])
+            print(f"  -> rfk-mouth.png ({img.size[0]}x{img.size[1]})")
 
     # Process baby mouths - crop just the mouth area
     print("\nProcessing baby mouths...")
     for i in range(1, 6):
         mouth_path = os.path.join(HEADS_DIR, f"babymouth{i}.png")
+        output_path = os.path.join(OUTPUT_DIR, f"babymouth{i}.png")
+        stage = f"ai:babymouth{i}"
         if os.path.exists(mouth_path):
-            img = Image.open(mouth_path).convert("RGBA")
-            output_path = os.path.join(OUTPUT_DIR, f"babymouth{i}.png")
-            img.save(output_path, "PNG")
+            if build_cache.is_fresh(stage, [mouth_path], [output_path]):
+                print(f"  -> babymouth{i}.png (up to date)")
+                continue
+            img = load_image(mouth_path, "RGBA")
+            save_image(img, output_path)
+            build_cache.record(stage, [mouth_path], [output_path])
             print(f"  -> babymouth{i}.png ({img.size[0]}x{img.size[1]})")
 
     # List final assets
@@ -69,13 +213,10 @@ def main():
     print()
 
     total_size = 0
-    for f in sorted(os.listdir(OUTPUT_DIR)):
-        if f.endswith('.png'):
-            path = os.path.join(OUTPUT_DIR, f)
-            img = Image.open(path)
-            size = os.path.getsize(path)
-            total_size += size
-            print(f"  {f:30} {img.size[0]:4}x{img.size[1]:<4}  ({size//1024:>4} KB)")
+    for f, meta in list_assets(OUTPUT_DIR, [".png"]):
+        size = meta["bytes"]
+        total_size += size
+        print(f"  {f:30} {meta['width']:4}x{meta['height']:<4}  ({size//1024:>4} KB)")
 
     print()
     print(f"  Total: {total_size//1024} KB")
@@ -85,4 +226,8 @@ def main():
     print("=" * 60)
 
 if __name__ == "__main__":
-    main()
+    max_side = INFERENCE_MAX_SIDE
+    for arg in sys.argv[1:]:
+        if arg.startswith("--max-side="):
+            max_side = int(arg.split("=", 1)[1])
+    main(tiered="--tiered" in sys.argv[1:], max_side=max_side)
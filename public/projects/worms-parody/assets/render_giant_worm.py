@@ -0,0 +1,118 @@
+"""
+Tiled renderer for very large GIANT Dune worm composites
+Renders the giant worm (body, baby mouth, emergence shading) one horizontal
+band at a time and streams each band straight into the PNG encoder, so peak
+memory depends on the band size, not on the output size. Used for the 4K
+and 8K versions for the bridge scene and for print.
+
+They are written to print/, not animation-ready/, so the web encoder and
+the DPR variants never pick up these tens-of-megapixel files.
+"""
+
+from PIL import Image, ImageDraw
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # POSIX only; peak RSS is just not reported elsewhere (e.g. Windows)
+    resource = None
+
+import build_cache
+import gradients
+from create_animation_assets import (GIANT_SIZE, GIANT_SEGMENTS, GIANT_MOUTH_WIDTH, GIANT_MOUTH_Y,
+                                     GIANT_SHADE, draw_dune_worm_body, layer)
+from png_stream import save_png_stream
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESSED_DIR = os.path.join(ASSETS_DIR, "processed")
+OUTPUT_DIR = os.path.join(ASSETS_DIR, "print")
+MOUTH_PATH = os.path.join(PROCESSED_DIR, "babymouth1.png")
+
+# Output sizes, keeping the 4:5 giant layout (long side = UHD width)
+SIZES = {
+    "4k": (3072, 3840),
+    "8k": (6144, 7680),
+}
+
+# Pixels rendered and encoded at a time; bands get fewer rows as the
+# output gets wider, so memory stays the same at any size
+BAND_PIXELS = 1 << 20
+
+def giant_layout(size, mouth_size):
+    """Mouth (x, y, width, height) on a giant worm of size, as composite_baby_mouth_worm places it"""
+    width, height = size
+    mouth_scale = (width * GIANT_MOUTH_WIDTH) / mouth_size[0]
+    mouth_w = int(mouth_size[0] * mouth_scale)
+    mouth_h = int(mouth_size[1] * mouth_scale)
+    mouth_y = round(GIANT_MOUTH_Y * height / GIANT_SIZE[1])
+    return (width - mouth_w) // 2, mouth_y, mouth_w, mouth_h
+
+def render_band(size, top, bottom, mouth):
+    """Rows top..bottom of the giant worm as an RGBA image"""
+    width, height = size
+    band = Image.new("RGBA", (width, bottom - top), (0, 0, 0, 0))
+    draw_dune_worm_body(ImageDraw.Draw(band), width, height, GIANT_SEGMENTS, top=top)
+
+    # Resample just the slice of the mouth that falls in this band
+    mouth_x, mouth_y, mouth_w, mouth_h = giant_layout(size, mouth.size)
+    y0, y1 = max(top, mouth_y), min(bottom, mouth_y + mouth_h)
+    if y0 < y1:
+        scale = mouth.height / mouth_h
+        piece = mouth.resize((mouth_w, y1 - y0), Image.Resampling.LANCZOS,
+                             box=(0, (y0 - mouth_y) * scale, mouth.width, (y1 - mouth_y) * scale))
+        band.paste(piece, (mouth_x, y0 - top), piece)
+
+    # Emergence shading, darkening toward the bottom
+    shade = gradients.alpha_ramp(width, bottom - top, height // 2 - top, GIANT_SHADE, span=height // 2)
+    return Image.alpha_composite(band, shade)
+
+def render_bands(size, mouth, band_pixels=BAND_PIXELS):
+    """Yield the giant worm of size top to bottom, about band_pixels at a time"""
+    band_height = max(1, band_pixels // size[0])
+    for top in range(0, size[1], band_height):
+        yield render_band(size, top, min(size[1], top + band_height), mouth)
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, KB on Linux and the BSDs
+    return peak // (1 << 20) if sys.platform == "darwin" else peak // 1024
+
+def main():
+    print("=" * 60)
+    print("WORMS PARODY - TILED GIANT DUNE WORM")
+    print("=" * 60)
+    print()
+
+    if not os.path.exists(MOUTH_PATH):
+        print(f"  File not found: {MOUTH_PATH}")
+        return
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    for label, size in SIZES.items():
+        output_path = os.path.join(OUTPUT_DIR, f"DUNE-WORM-GIANT-{label}.png")
+        stage = f"render_giant_worm:{label}"
+        params = dict(size=size, band_pixels=BAND_PIXELS)
+        if build_cache.is_fresh(stage, [MOUTH_PATH], [output_path], **params):
+            print(f"  Up to date: {os.path.basename(output_path)}")
+            continue
+
+        start = time.perf_counter()
+        entry = save_png_stream(output_path, size, "RGBA", render_bands(size, layer(MOUTH_PATH)))
+        build_cache.record(stage, [MOUTH_PATH], [output_path], **params)
+        peak = peak_rss_mb()
+        print(f"  Saved: {os.path.basename(output_path)} ({size[0]}x{size[1]}, {entry['bytes'] // 1024} KB)"
+              f" in {time.perf_counter() - start:.1f}s" + (f", peak RSS {peak} MB" if peak is not None else ""))
+
+    print()
+    print("=" * 60)
+    print(f"DONE! Giant worms saved to: {OUTPUT_DIR}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Render-stage profiler for the Worms Parody background generators
+Generators wrap each logical drawing stage in stage(name, lambda: img). That
+is a no-op unless a profiling() block is active, in which case every stage
+records:
+
+  - wall time
+  - allocations: Pillow images created, and peak Python/NumPy bytes
+  - pixels it changed on the canvas
+  - pixels whose final value it set (its contribution to the output)
+
+report() lists them and flags stages that contributed nothing, i.e. work
+that was thrown away or painted over.
+"""
+
+import contextlib
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+# Active profile: {"stages": [stage records], "owner": per-pixel index of the
+# last stage that changed it}, or None when not profiling
+_profile = None
+
+@contextlib.contextmanager
+def profiling():
+    """Profile every stage() run inside; yields the list of stage records"""
+    global _profile
+    _profile = {"stages": [], "owner": None}
+    tracemalloc.start()
+    try:
+        yield _profile["stages"]
+    finally:
+        tracemalloc.stop()
+        owner = _profile["owner"]
+        for index, record in enumerate(_profile["stages"]):
+            record["final_pixels"] = int((owner == index).sum()) if owner is not None else 0
+        _profile = None
+
+@contextlib.contextmanager
+def stage(name, image, post=False):
+    """
+    Profile the enclosed drawing as stage name; image is a callable returning
+    the current canvas (it may be replaced inside). A post stage (grain,
+    filters) touches every pixel without replacing what earlier stages drew,
+    so it never takes their contribution away.
+    """
+    if _profile is None:
+        yield
+        return
+
+    before = np.asarray(image())
+    images_before = Image.core.get_stats()["new_count"]
+    tracemalloc.reset_peak()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - memory_before
+    images = Image.core.get_stats()["new_count"] - images_before
+
+    after = np.asarray(image())
+    if after.shape == before.shape:
+        diff = np.abs(after.astype(np.int16) - before)
+        changed = diff.any(axis=-1) if diff.ndim == 3 else diff > 0
+    else:
+        diff, changed = None, np.ones(after.shape[:2], dtype=bool)
+    if _profile["owner"] is None or _profile["owner"].shape != changed.shape:
+        _profile["owner"] = np.full(changed.shape, -1, dtype=np.int16)
+    index = len(_profile["stages"])
+    if not post:
+        _profile["owner"][changed] = index
+
+    _profile["stages"].append({
+        "name": name,
+        "seconds": seconds,
+        "images": images,
+        "peak_bytes": peak,
+        "changed_pixels": int(changed.sum()),
+        "mean_delta": float(diff[changed].mean()) if diff is not None and changed.any() else 0.0,
+        "post": post,
+    })
+
+def report(stages):
+    """Lines of a per-stage table, flagging stages with no effect on the output"""
+    lines = [f"    {'stage':<24}{'ms':>8}{'images':>8}{'peak KB':>9}{'changed px':>12}{'final px':>10}"]
+    for s in stages:
+        final = "-" if s["post"] else s["final_pixels"]
+        line = (f"    {s['name']:<24}{s['seconds'] * 1000:>8.1f}{s['images']:>8}"
+                f"{s['peak_bytes'] // 1024:>9}{s['changed_pixels']:>12}{final:>10}")
+        if s["changed_pixels"] == 0:
+            line += "  <- no effect (dead work)"
+        elif not s["post"] and s["final_pixels"] == 0:
+            line += "  <- fully painted over"
+        lines.append(line)
+    total = sum(s["seconds"] for s in stages)
+    wasted = sum(s["seconds"] for s in stages if not s["post"] and s["final_pixels"] == 0)
+    lines.append(f"    {len(stages)} stages in {total * 1000:.1f} ms, {wasted * 1000:.1f} ms on stages"
+                 f" that never reach the output")
+    return lines
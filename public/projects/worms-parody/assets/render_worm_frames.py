@@ -0,0 +1,108 @@
+"""
+Batch worm animation frames for Worms Parody
+Renders every cartoon worm expression at FPS wobble phases (one second of
+constant rathergood-style wobble) into one sprite strip per expression, so
+the player steps through frames instead of transforming the worm each tick
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw
+import json
+import math
+import os
+import random
+import time
+
+import build_cache
+from asset_index import save_image, write_asset
+from create_animation_assets import draw_worm
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(ASSETS_DIR, "animation-ready", "worm-frames")
+INDEX_PATH = os.path.join(OUTPUT_DIR, "worm-frames.json")
+
+# CONFIG.FPS and CONFIG.WOBBLE_AMOUNT in animation.js
+FPS = 12
+WOBBLE_AMOUNT = 2
+
+# One wobble cycle per second
+PHASES = FPS
+
+EXPRESSIONS = ["neutral", "happy", "open", "smug", "chomp", "looking_up"]
+
+# Same frame and pose as the single worm-<expression>.png images
+FRAME_SIZE = (150, 200)
+WORM_POS = (75, 40)
+WORM_SIZE = 140
+WORM_PINK = (255, 180, 190, 255)
+
+def render_frame(expression, phase_index, phases=PHASES, wobble=WOBBLE_AMOUNT):
+    """
+    One worm frame: the S-curve advanced by phase_index / phases of a full
+    cycle, plus a jitter of up to +/-wobble px like wobble() in animation.js,
+    seeded per frame so reruns are identical
+    """
+    rng = random.Random(f"{expression}:{phase_index}")
+    dx = rng.uniform(-wobble, wobble)
+    dy = rng.uniform(-wobble, wobble)
+    phase = 2 * math.pi * phase_index / phases
+
+    frame = Image.new("RGBA", FRAME_SIZE, (0, 0, 0, 0))
+    draw_worm(ImageDraw.Draw(frame), WORM_POS[0] + dx, WORM_POS[1] + dy, WORM_SIZE, WORM_PINK,
+              expression=expression, phase=phase)
+    return frame
+
+def render_strip(expression, phases=PHASES, wobble=WOBBLE_AMOUNT):
+    """All phases of one expression side by side; returns (strip, seconds)"""
+    start = time.perf_counter()
+    strip = Image.new("RGBA", (FRAME_SIZE[0] * phases, FRAME_SIZE[1]), (0, 0, 0, 0))
+    for i in range(phases):
+        strip.paste(render_frame(expression, i, phases, wobble), (i * FRAME_SIZE[0], 0))
+    return strip, time.perf_counter() - start
+
+def _strip_path(expression):
+    return os.path.join(OUTPUT_DIR, f"worm-{expression}.png")
+
+def main():
+    print("=" * 60)
+    print("WORMS PARODY - WORM ANIMATION FRAMES")
+    print("=" * 60)
+    print()
+
+    outputs = [INDEX_PATH] + [_strip_path(expr) for expr in EXPRESSIONS]
+    params = dict(expressions=EXPRESSIONS, phases=PHASES, wobble=WOBBLE_AMOUNT,
+                  frame=FRAME_SIZE, pos=WORM_POS, size=WORM_SIZE)
+    if build_cache.is_fresh("render_worm_frames", [], outputs, **params):
+        print(f"  Up to date: {OUTPUT_DIR}")
+        return
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    start = time.perf_counter()
+    index = {
+        "fps": FPS,
+        "frameWidth": FRAME_SIZE[0],
+        "frameHeight": FRAME_SIZE[1],
+        "frameCount": PHASES,
+        # Frame i of a strip is at x = i * frameWidth
+        "strips": {},
+    }
+    # Strips are independent: one expression per worker
+    with ProcessPoolExecutor() as pool:
+        strips = pool.map(render_strip, EXPRESSIONS)
+        for expr, (strip, seconds) in zip(EXPRESSIONS, strips):
+            save_image(strip, _strip_path(expr))
+            index["strips"][expr] = os.path.basename(_strip_path(expr))
+            print(f"  Saved: worm-{expr}.png ({PHASES} frames, rendered in {seconds * 1000:.0f} ms)")
+
+    write_asset(INDEX_PATH, json.dumps(index, indent=1).encode())
+    build_cache.record("render_worm_frames", [], outputs, **params)
+    total = PHASES * len(EXPRESSIONS)
+    print(f"\n  {total} frames in {time.perf_counter() - start:.2f}s (render, encode and save)")
+
+    print()
+    print("=" * 60)
+    print(f"DONE! Sprite strips and worm-frames.json in: {OUTPUT_DIR}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
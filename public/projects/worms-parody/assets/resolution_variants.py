@@ -0,0 +1,127 @@
+"""
+Device-pixel-ratio variants for Worms Parody character assets
+Emits @1x/@2x/@3x copies sized to the largest size animation.js ever draws
+each asset at, plus a manifest the player can pick from
+"""
+
+from PIL import Image
+import json
+import math
+import os
+
+import build_cache
+from asset_index import read_manifest, save_image, write_asset
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(ASSETS_DIR, "dpr")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+
+DEVICE_PIXEL_RATIOS = [1, 2, 3]
+
+# Largest on-screen scale (canvas px per source px) each asset is drawn at,
+# taken from the scale chains in animation.js. Some assets are drawn larger
+# than the canvas and only partly on screen, so sizes are not clamped to it.
+MAX_DRAW_SCALE = {
+    # headScale 0.65 x max state.rfk.scale 0.55 x shoulder pump 1.04
+    "processed/rfk-head-clean.png": 0.38,
+    # 28% of the drawn head width, stretched up to 1.2x when open
+    "RFKmouth.png": 0.40,
+    # headScale 0.9 x jayScale 0.55 x max state.jay.scale 1.0
+    "processed/jay-head-clean.png": 0.50,
+    # mouthScale 0.216 x jayScale 0.55 x open 1.3
+    "processed/babymouth3-clean.png": 0.16,
+    # drumScale 0.7 x jayScale 0.55
+    "drumset-transparent.png": 0.39,
+    # Instrument offset scale x woodwind worm scale 0.5
+    "Instruments/clarinet.png": 0.18,
+    "Instruments/saxophone.png": 0.20,
+    "Instruments/oboe.png": 0.13,
+    # Woodwind worms draw real worms at scale 0.5
+    "animation-ready/real-worm1.png": 0.50,
+    "animation-ready/real-worm2.png": 0.50,
+    "animation-ready/real-worm3-clean.png": 0.50,
+    # Cartoon worms grow to 1.2 in the outro
+    "animation-ready/worm-neutral.png": 1.2,
+    "animation-ready/worm-happy.png": 1.2,
+    "animation-ready/worm-open.png": 1.2,
+    "animation-ready/worm-smug.png": 1.2,
+    "animation-ready/worm-chomp.png": 1.2,
+    # state.duneWorm.scale up to 1.0 x mouth pulse 1.2 (500x700 -> 600x840)
+    "animation-ready/DUNE-WORM-GIANT.png": 1.2,
+}
+
+def display_size(size, scale):
+    """Largest canvas-pixel size an asset of size is drawn at"""
+    return max(1, math.ceil(size[0] * scale)), max(1, math.ceil(size[1] * scale))
+
+def make_variants(img, scale, ratios=DEVICE_PIXEL_RATIOS):
+    """
+    (ratio, image) pairs, each sized display_size * ratio but never larger
+    than the source (upscaling adds bytes without detail)
+    """
+    base_w, base_h = display_size(img.size, scale)
+    variants = []
+    for ratio in ratios:
+        w = min(img.width, base_w * ratio)
+        h = min(img.height, base_h * ratio)
+        if (w, h) == img.size:
+            variants.append((ratio, img))
+        else:
+            # Pillow resizes RGBA with premultiplied alpha, so edges stay clean
+            variants.append((ratio, img.resize((w, h), Image.Resampling.LANCZOS)))
+    return variants
+
+def main():
+    print("=" * 60)
+    print("WORMS PARODY - DEVICE PIXEL RATIO VARIANTS")
+    print("=" * 60)
+    print()
+
+    manifest = read_manifest(MANIFEST_PATH)
+    for rel_path, scale in MAX_DRAW_SCALE.items():
+        src_path = os.path.join(ASSETS_DIR, rel_path)
+        if not os.path.exists(src_path):
+            print(f"  File not found: {rel_path}")
+            continue
+        stem = os.path.splitext(rel_path)[0]
+        outputs = [os.path.join(OUTPUT_DIR, f"{stem}@{r}x.png") for r in DEVICE_PIXEL_RATIOS]
+        params = dict(scale=scale, ratios=DEVICE_PIXEL_RATIOS)
+        stage = f"resolution_variants:{rel_path}"
+        if rel_path in manifest and build_cache.is_fresh(stage, [src_path], outputs, **params):
+            print(f"  {rel_path:40} up to date")
+            continue
+
+        img = Image.open(src_path).convert("RGBA")
+        os.makedirs(os.path.dirname(outputs[0]), exist_ok=True)
+        entry = {
+            "source": rel_path,
+            "sourceWidth": img.width,
+            "sourceHeight": img.height,
+            "displayWidth": display_size(img.size, scale)[0],
+            "displayHeight": display_size(img.size, scale)[1],
+            "variants": {},
+        }
+        for (ratio, variant), output_path in zip(make_variants(img, scale), outputs):
+            save_image(variant, output_path)
+            entry["variants"][f"{ratio}x"] = {
+                "file": os.path.relpath(output_path, OUTPUT_DIR).replace(os.sep, "/"),
+                "width": variant.width,
+                "height": variant.height,
+            }
+        manifest[rel_path] = entry
+        build_cache.record(stage, [src_path], outputs, **params)
+        sizes = ", ".join(f"{k} {v['width']}x{v['height']}" for k, v in entry["variants"].items())
+        print(f"  {rel_path:40} {img.width}x{img.height} -> {sizes}")
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    write_asset(MANIFEST_PATH, json.dumps(manifest, indent=1, sort_keys=True).encode())
+
+    print()
+    print("=" * 60)
+    print(f"DONE! Variants and manifest.json in: {OUTPUT_DIR}")
+    print("Pick variants['<ceil(devicePixelRatio)>x'] and draw it at")
+    print("sourceWidth/Height times the existing scale factors.")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Declarative background scenes for the Worms Parody pipeline
+A scene is a JSON file (scenes/<name>.json) listing layers in paint order:
+
+    {
+      "name": "nih",
+      "output": "nih-building.jpg",
+      "size": [800, 600],
+      "background": [0, 0, 0],
+      "layers": [
+        {"type": "gradient", "box": [0, 0, 800, 300], "top": [100, 130, 150], "bottom": [100, 130, 200]},
+        {"type": "shapes", "shapes": [{"rect": [0, 300, 800, 600], "fill": [80, 100, 70]}]},
+        {"type": "blobs", "count": 30, "radius": {"rand": [50, 150]}, "color": [255, 107, 157], "opacity": 0.3},
+        {"type": "noise", "amount": 10}
+      ]
+    }
+
+Coordinates are in the scene's design size and scaled to whatever size it is
+rendered at. Any value can be {"rand": [lo, hi]}, drawn from the scene RNG
+when the scene is compiled, or an expression string such as
+"x - tw // 2 + rand(-10, 10)": arithmetic, comparisons, "a if c else b",
+and/or, lists and [index] over the variables in scope, with rand(lo, hi),
+random(), uniform(lo, hi), range(...), sin, cos, round, min, max, abs and
+pi. Random draws happen in the order values appear in the file, so the
+same seed always gives the same scene.
+
+Variables: phase (0..1 through an animated loop, 0 for stills), animated
+(true inside a loop of a scene marked "animated") and whatever the scene's
+"let" ({name: value}, evaluated in order before the layers) and enclosing
+groups bind.
+
+Shapes: rect, ellipse, arc (boxes [x0, y0, x1, y1]), line and polygon (point
+lists), with fill, width and, for arcs, start/end angles. "repeat": n draws
+the shape n times moving by "step" each time, either [dx, dy] or, for boxes,
+[dx0, dy0, dx1, dy1]; "repeat": [cols, rows] lays out a grid with step
+[dx, dy] between columns and rows. A point list can also be a random walk,
+{"walk": {"from": [x, y], "steps": n, "by": [dx, dy]}}, with dx and dy
+drawn anew for every step.
+
+A group, {"in": ..., "for": name, "let": {...}, "if": cond, "shapes": [...]},
+draws its shapes once per item of "in": a count (binding name, default "i",
+to 0..n-1), a list of values bound to name, or a list of {name: value}
+objects. "let" binds more variables per item, evaluated in order, and items
+for which "if" is false are skipped. This is how seeded random placement
+(tombstones, roots, swirls) is written.
+
+A rows layer fills the canvas row by row with a color whose bands are
+expressions over the row's y (design coordinates) and t = y / height,
+evaluated as arrays. A fog layer is a band of color thickening to "alpha"
+at the bottom of its box; in an animated loop it is broken into wisps that
+drift one box width per loop.
+
+Blobs are soft_blobs (analytic Gaussian-edged disks) with a given opacity at
+the center and softness (edge blur as a fraction of the radius).
+
+Compiling resolves every shape to final pixel coordinates and groups them per
+layer: a shapes layer that is opaque, unblurred and at full opacity draws
+straight onto the canvas (consecutive ones are merged into one pass); any
+other layer is drawn into one RGBA image and composited once.
+"""
+
+from PIL import Image, ImageDraw, ImageFilter
+import ast
+import functools
+import json
+import math
+import operator
+import os
+
+import numpy as np
+
+import gradients
+import grain
+import render_profile
+import soft_blobs
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENES_DIR = os.path.join(ASSETS_DIR, "scenes")
+
+BOX_SHAPES = ("rect", "ellipse", "arc")
+POINT_SHAPES = ("line", "polygon")
+
+def scene_path(name):
+    return os.path.join(SCENES_DIR, f"{name}.json")
+
+def list_scenes():
+    """Names of every scene file in SCENES_DIR"""
+    if not os.path.isdir(SCENES_DIR):
+        return []
+    return sorted(f[:-5] for f in os.listdir(SCENES_DIR) if f.endswith(".json"))
+
+def load_scene(name):
+    with open(scene_path(name)) as f:
+        return json.load(f)
+
+_BINARY = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+           ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow}
+_UNARY = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: operator.not_}
+_COMPARE = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+            ast.Eq: operator.eq, ast.NotEq: operator.ne}
+
+def _elementwise(scalar, array):
+    # math for plain numbers (exactly what drawing code in Python gets), NumPy for rows layers
+    return lambda v: array(v) if isinstance(v, np.ndarray) else scalar(v)
+
+def scope(rng, phase=None, **variables):
+    """Variables and functions expressions can use, random ones drawing from rng"""
+    return {
+        "rand": rng.randint, "random": rng.random, "uniform": rng.uniform, "range": range,
+        "sin": _elementwise(math.sin, np.sin), "cos": _elementwise(math.cos, np.cos),
+        "round": round, "min": min, "max": max, "abs": abs, "pi": math.pi,
+        "phase": phase or 0, "animated": phase is not None, **variables,
+    }
+
+@functools.lru_cache(maxsize=None)
+def _parse(expression):
+    return ast.parse(expression.strip(), mode="eval").body
+
+def _eval(node, env):
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in env:
+            raise ValueError(f"Unknown name in scene expression: {node.id}")
+        return env[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        left = _eval(node.left, env)
+        return _BINARY[type(node.op)](left, _eval(node.right, env))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        return _UNARY[type(node.op)](_eval(node.operand, env))
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+        left = _eval(node.left, env)
+        for op, right_node in zip(node.ops, node.comparators):
+            right = _eval(right_node, env)
+            if not _COMPARE[type(op)](left, right):
+                return False
+            left = right
+        return True
+    if isinstance(node, ast.BoolOp):
+        # Short-circuits like Python, so skipped operands draw no random numbers
+        for operand in node.values:
+            value = _eval(operand, env)
+            if bool(value) == isinstance(node.op, ast.Or):
+                return value
+        return value
+    if isinstance(node, ast.IfExp):
+        return _eval(node.body if _eval(node.test, env) else node.orelse, env)
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_eval(v, env) for v in node.elts]
+    if isinstance(node, ast.Subscript):
+        return _eval(node.value, env)[_eval(node.slice, env)]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        return _eval(node.func, env)(*[_eval(a, env) for a in node.args])
+    raise ValueError(f"Unsupported scene expression: {ast.unparse(node)}")
+
+def evaluate(expression, env):
+    """Value of an expression string over the variables in env"""
+    return _eval(_parse(expression), env)
+
+def _walk(walk, env):
+    x, y = resolve(walk["from"], env)
+    points = [[x, y]]
+    for _ in range(resolve(walk["steps"], env)):
+        x += resolve(walk["by"][0], env)
+        y += resolve(walk["by"][1], env)
+        points.append([x, y])
+    return points
+
+def resolve(value, env):
+    """
+    value with every {"rand": [lo, hi]}, walk and expression string
+    replaced by what it evaluates to in env (see scope)
+    """
+    if isinstance(value, str):
+        return evaluate(value, env)
+    if isinstance(value, dict):
+        if "rand" in value:
+            return env["rand"](*resolve(value["rand"], env))
+        if "walk" in value:
+            return _walk(value["walk"], env)
+        return {k: resolve(v, env) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(v, env) for v in value]
+    return value
+
+def _shape_kind(shape):
+    for kind in BOX_SHAPES + POINT_SHAPES:
+        if kind in shape:
+            return kind
+    raise ValueError(f"Unknown shape: {shape}")
+
+def _offsets(shape):
+    """Geometry offsets, one per repetition of shape"""
+    repeat = shape.get("repeat", 1)
+    step = shape.get("step", [0, 0])
+    if isinstance(repeat, list):
+        cols, rows = repeat
+        return [(c * step[0], r * step[1]) * 2 for r in range(rows) for c in range(cols)]
+    if len(step) == 2:
+        step = step * 2
+    return [tuple(i * d for d in step) for i in range(repeat)]
+
+def _compile_shape(shape, sx, sy, env):
+    """Draw calls (kind, geometry, options) for one shape in pixel coordinates"""
+    shape = resolve(shape, env)
+    kind = _shape_kind(shape)
+    options = {"fill": tuple(shape["fill"])}
+    if "width" in shape:
+        options["width"] = max(1, round(shape["width"] * sx))
+    if kind == "arc":
+        options["start"], options["end"] = shape.get("start", 0), shape.get("end", 360)
+
+    calls = []
+    for offset in _offsets(shape):
+        if kind in BOX_SHAPES:
+            x0, y0, x1, y1 = (v + d for v, d in zip(shape[kind], offset))
+            geometry = [x0 * sx, y0 * sy, x1 * sx, y1 * sy]
+        else:
+            geometry = [((x + offset[0]) * sx, (y + offset[1]) * sy) for x, y in shape[kind]]
+        calls.append((kind, geometry, options))
+    return calls
+
+def _compile_group(group, sx, sy, env):
+    """Draw calls for a group's shapes, once per item it places (see module docstring)"""
+    items = resolve(group.get("in", [{}]), env)
+    if isinstance(items, int):
+        items = range(items)
+    calls = []
+    for item in items:
+        inner = dict(env)
+        if isinstance(item, dict):
+            inner.update(item)
+        else:
+            inner[group.get("for", "i")] = item
+        for name, value in group.get("let", {}).items():
+            inner[name] = resolve(value, inner)
+        if "if" in group and not resolve(group["if"], inner):
+            continue
+        calls.extend(_compile_shapes(group["shapes"], sx, sy, inner))
+    return calls
+
+def _compile_shapes(shapes, sx, sy, env):
+    calls = []
+    for shape in shapes:
+        if "shapes" in shape:
+            calls.extend(_compile_group(shape, sx, sy, env))
+        else:
+            calls.extend(_compile_shape(shape, sx, sy, env))
+    return calls
+
+def _draw(draw, calls):
+    for kind, geometry, options in calls:
+        if kind == "rect":
+            draw.rectangle(geometry, fill=options["fill"])
+        elif kind == "ellipse":
+            draw.ellipse(geometry, fill=options["fill"])
+        elif kind == "arc":
+            draw.arc(geometry, options["start"], options["end"], fill=options["fill"],
+                     width=options.get("width", 1))
+        elif kind == "line":
+            draw.line(geometry, fill=options["fill"], width=options.get("width", 1))
+        else:
+            draw.polygon(geometry, fill=options["fill"])
+
+def _compile_blobs(layer, scene_size, sx, sy, env):
+    """Soft blobs at random spots (default: anywhere on the canvas)"""
+    blobs = []
+    for _ in range(layer["count"]):
+        x = resolve(layer.get("x", {"rand": [0, scene_size[0]]}), env)
+        y = resolve(layer.get("y", {"rand": [0, scene_size[1]]}), env)
+        r = resolve(layer["radius"], env)
+        color = tuple(resolve(layer["color"], env))
+        blobs.append((round(x * sx), round(y * sy), max(1, round(r * sx)), color, layer.get("opacity", 0.3)))
+    return ("blobs", blobs, layer.get("softness", soft_blobs.SOFTNESS))
+
+def _rows(layer, size, sy, env):
+    """(height, 3) row colors of a rows layer"""
+    y = np.arange(size[1]) / sy
+    env = dict(env, y=y, t=y / (size[1] / sy))
+    rows = np.empty((size[1], 3))
+    for band, expression in enumerate(layer["color"]):
+        rows[:, band] = resolve(expression, env)
+    return rows
+
+def drifting_fog(width, height, max_alpha, color, phase):
+    """
+    Fog band thickening toward the bottom like alpha_ramp, broken into wisps
+    that drift one band width per loop, so phase 0 and 1 match
+    """
+    x = gradients.positions(width)[None, :]
+    y = gradients.positions(height)[:, None]
+    # Whole waves across the width keep the drift seamless
+    wisps = sum(np.sin(2 * math.pi * k * (x - phase) + 3 * k * y + k) for k in (1, 2, 3)) / 3
+    pixels = np.empty((height, width, 4), dtype=np.uint8)
+    pixels[..., :3] = color
+    pixels[..., 3] = max_alpha * y * (0.6 + 0.4 * wisps)
+    return Image.fromarray(pixels, "RGBA")
+
+def compile_scene(scene, size, rng, frame=None, phase=None, with_grain=True):
+    """
+    Ops for rendering scene at size (width, height), with every random value
+    drawn from rng; the same rng state always gives the same ops. frame (of
+    a loop) changes the film grain, phase (0..1, for scenes marked
+    "animated") whatever the scene animates with it. with_grain=False leaves
+    out noise layers.
+    """
+    design_w, design_h = scene["size"]
+    sx, sy = size[0] / design_w, size[1] / design_h
+    env = scope(rng, phase)
+    for name, value in scene.get("let", {}).items():
+        env[name] = resolve(value, env)
+    ops = []
+    for layer in scene["layers"]:
+        kind = layer["type"]
+        if kind == "gradient":
+            x0, y0, x1, y1 = layer.get("box", [0, 0, design_w, design_h])
+            box = (round(x0 * sx), round(y0 * sy), round(x1 * sx), round(y1 * sy))
+            ops.append(("gradient", box, layer["top"], layer["bottom"]))
+        elif kind == "shapes":
+            calls = _compile_shapes(layer["shapes"], sx, sy, env)
+            if not calls:
+                # e.g. every group's "if" was false
+                continue
+            blur = layer.get("blur", 0) * sx
+            opacity = layer.get("opacity", 1.0)
+            opaque = all(len(opts["fill"]) == 3 or opts["fill"][3] == 255 for _, _, opts in calls)
+            if opaque and not blur and opacity == 1.0:
+                if ops and ops[-1][0] == "draw":
+                    ops[-1][1].extend(calls)
+                else:
+                    ops.append(("draw", calls))
+            else:
+                ops.append(("layer", calls, blur, opacity))
+        elif kind == "blobs":
+            ops.append(_compile_blobs(layer, scene["size"], sx, sy, env))
+        elif kind == "rows":
+            ops.append(("rows", _rows(layer, size, sy, env)))
+        elif kind == "fog":
+            x0, y0, x1, y1 = layer.get("box", [0, 0, design_w, design_h])
+            box = (round(x0 * sx), round(y0 * sy), round(x1 * sx), round(y1 * sy))
+            ops.append(("fog", box, tuple(layer["color"]), layer["alpha"], phase))
+        elif kind == "noise":
+            if not with_grain:
+                continue
+            grain_size = max(1, round(layer.get("grain_size", 1) * sx))
+            ops.append(("noise", layer["amount"], grain.grain_rng(rng, frame), grain_size))
+        else:
+            raise ValueError(f"Unknown layer type: {kind}")
+    return ops
+
+def render_ops(ops, size, background=(0, 0, 0)):
+    """Run compiled ops on a fresh RGB canvas, each as a render_profile stage"""
+    img = Image.new("RGB", size, tuple(background))
+    for index, op in enumerate(ops):
+        with render_profile.stage(f"{op[0]} #{index}", lambda: img, post=op[0] == "noise"):
+            img = _run_op(img, op, size)
+    return img
+
+def _run_op(img, op, size):
+    if op[0] == "gradient":
+        _, (x0, y0, x1, y1), top, bottom = op
+        img.paste(gradients.vertical_gradient(x1 - x0, y1 - y0, top, bottom), (x0, y0))
+    elif op[0] == "draw":
+        _draw(ImageDraw.Draw(img), op[1])
+    elif op[0] == "rows":
+        img = gradients.fill_rows(size[0], op[1])
+    elif op[0] == "fog":
+        _, (x0, y0, x1, y1), color, alpha, phase = op
+        if phase is None:
+            fog = gradients.alpha_ramp(x1 - x0, y1 - y0, 0, alpha, color=color)
+        else:
+            fog = drifting_fog(x1 - x0, y1 - y0, alpha, color, phase)
+        img.paste(fog, (x0, y0), fog)
+    elif op[0] == "blobs":
+        img = soft_blobs.composite_blobs(img, op[1], op[2])
+    elif op[0] == "layer":
+        _, calls, blur, opacity = op
+        layer = Image.new("RGBA", size, (0, 0, 0, 0))
+        _draw(ImageDraw.Draw(layer), calls)
+        if blur:
+            layer = layer.filter(ImageFilter.GaussianBlur(blur))
+        if opacity != 1.0:
+            layer.putalpha(layer.getchannel("A").point(lambda a: round(a * opacity)))
+        img.paste(layer, (0, 0), layer)
+    else:
+        _, amount, noise_rng, grain_size = op
+        img = grain.add_noise(img, amount, noise_rng, grain_size)
+    return img
+
+def render_scene(scene, rng, size=None, frame=None, phase=None, with_grain=True):
+    """scene rendered at size (default: its design size), as frame of a loop at phase if given"""
+    size = tuple(size or scene["size"])
+    ops = compile_scene(scene, size, rng, frame, phase, with_grain)
+    return render_ops(ops, size, scene.get("background", (0, 0, 0)))
+
+def grain_amount(scene):
+    """Film grain amount of scene's noise layer (0 if it has none)"""
+    return next((layer["amount"] for layer in scene["layers"] if layer["type"] == "noise"), 0)